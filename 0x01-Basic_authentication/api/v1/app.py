@@ -4,6 +4,7 @@ Route module for the API
 """
 from os import getenv
 from api.v1.views import app_views
+from api.v1.auth.path_matcher import PathMatcher
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
@@ -13,6 +14,8 @@ app = Flask(__name__)
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 auth = None
+excluded_paths = PathMatcher(['/api/v1/status/', '/api/v1/unauthorized/',
+                              '/api/v1/forbidden/'])
 
 
 if getenv("AUTH_TYPE") == "basic_auth":
@@ -29,10 +32,7 @@ def handle_request() -> None:
     filter the request first before sending it.
     """
     if auth:
-        exclu = ['/api/v1/status/', '/api/v1/unauthorized/',
-                 '/api/v1/forbidden/']
-
-        if auth.require_auth(request.path, exclu):
+        if auth.require_auth(request.path, excluded_paths):
             if not auth.authorization_header(request):
                 abort(401)
             if not auth.current_user(request):
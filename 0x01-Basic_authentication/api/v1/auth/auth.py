@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """ file that setup authentication for users
 """
+from api.v1.auth.path_matcher import PathMatcher, compile_paths
 from typing import List, TypeVar
 
 
@@ -14,7 +15,8 @@ class Auth:
         fetch the path and validate it
         Args:
             path (str): required path
-            excluded_paths (List[str]): list of paths
+            excluded_paths (List[str]): list of paths, or a PathMatcher
+            compiled once from them
 
         Returns:
             bool: True if valid or False if not
@@ -22,12 +24,9 @@ class Auth:
         if not path or not excluded_paths:
             return True
 
-        for i in excluded_paths:
-            if i.endswith('*') and path.startswith(i[:-1]):
-                return False
-            elif i in {path, path + '/'}:
-                return False
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = compile_paths(tuple(excluded_paths))
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -2,9 +2,12 @@
 """ File that create a Basic Authentication Model
 """
 from api.v1.auth.auth import Auth
+from api.v1.auth.ttl_cache import TTLCache
 from models.user import User
 import re
 import base64
+import hashlib
+from os import getenv, urandom
 from typing import TypeVar
 from flask import abort
 
@@ -13,9 +16,73 @@ class BasicAuth(Auth):
     """
     Implementation of Basic Authentication Model
 
+    Headers that authenticated a user are remembered in a bounded LRU
+    cache (BASIC_AUTH_CACHE_SIZE entries, 0 to disable, for
+    BASIC_AUTH_CACHE_TTL seconds), keyed by a keyed digest of the header
+    so no credentials are kept in memory. A hit only costs a lookup by
+    id; it is dropped if the user was removed or their email or
+    password changed since.
+
     Args:
         Auth (TypeVar('Auth')): the authentication model
     """
+    def __init__(self):
+        """ initialize the credential cache
+        """
+        self.cache = TTLCache(int(getenv('BASIC_AUTH_CACHE_SIZE', 1024)),
+                              int(getenv('BASIC_AUTH_CACHE_TTL', 300)))
+        self.cache_key = urandom(32)
+
+    def cache_digest(self, authorization_header: str) -> bytes:
+        """
+        keyed digest of a header, the cache key
+
+        Args:
+            authorization_header (str): the Authorization header
+
+        Returns:
+            bytes: the digest
+        """
+        return hashlib.blake2b(authorization_header.encode(),
+                               key=self.cache_key, digest_size=16).digest()
+
+    def cached_user(self, authorization_header: str) -> TypeVar('User'):
+        """
+        user a header was verified for, if still valid
+
+        Args:
+            authorization_header (str): the Authorization header
+
+        Returns:
+            TypeVar('User'): the user, None on a miss
+        """
+        if self.cache.size <= 0:
+            return None
+        digest = self.cache_digest(authorization_header)
+        entry = self.cache.get(digest)
+        if entry is None:
+            return None
+
+        user_id, email, password = entry
+        user = User.get(user_id)
+        if user is None or user.email != email or user.password != password:
+            self.cache.pop(digest)
+            return None
+        return user
+
+    def cache_user(self, authorization_header: str, user: TypeVar('User')):
+        """
+        remember that a header authenticates user
+
+        Args:
+            authorization_header (str): the Authorization header
+            user (TypeVar('User')): the authenticated user
+        """
+        if self.cache.size <= 0:
+            return
+        self.cache.set(self.cache_digest(authorization_header),
+                       (user.id, user.email, user.password))
+
     def extract_base64_authorization_header(self,
                                             authorization_header: str) -> str:
         """
@@ -94,14 +161,9 @@ class BasicAuth(Auth):
             return None
 
         try:
-            database = User.search()
-            if len(database) == 0:
-                return None
-
-            for user in database:
-                if user.email == user_email:
-                    if user.is_valid_password(user_pwd):
-                        return user
+            for user in User.search({'email': user_email}):
+                if user.is_valid_password(user_pwd):
+                    return user
             return None
         except Exception:
             return None
@@ -120,6 +182,10 @@ class BasicAuth(Auth):
         if not header:
             return None
 
+        user_obj = self.cached_user(header)
+        if user_obj:
+            return user_obj
+
         base = self.extract_base64_authorization_header(header)
         if not base:
             return None
@@ -137,4 +203,5 @@ class BasicAuth(Auth):
         if not user_obj:
             return None
 
+        self.cache_user(header, user_obj)
         return user_obj
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+""" File that create a bounded cache with expiring entries
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Least recently used cache of at most `size` entries (0 disables it),
+    each kept for `ttl` seconds, or less when set with a shorter one.
+    Counts its hits and misses.
+    """
+    def __init__(self, size: int, ttl: float):
+        """
+        initialize an empty cache
+
+        Args:
+            size (int): maximum number of entries
+            ttl (float): default lifetime of an entry, in seconds
+        """
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """ number of entries, expired ones included
+        """
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """
+        value of a key, if present and not expired
+
+        Args:
+            key: the key
+            default: returned on a miss
+
+        Returns:
+            the value, or default
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        """
+        store a value, evicting the least recently used entries
+
+        Args:
+            key: the key
+            value: the value
+            ttl (float, optional): lifetime of this entry, in seconds
+        """
+        if self.size <= 0:
+            return
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        """
+        drop a key
+
+        Args:
+            key: the key
+        """
+        with self.lock:
+            self.entries.pop(key, None)
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+""" In-memory storage engine backed by `.db_<Class>.*` files
+"""
+from typing import TypeVar, Iterable, Iterator, List, Tuple
+from os import path, getenv
+from models.engine.binary_store import BinaryStore
+from models.engine.json_stream import iter_items
+from models.engine.sorted_index import SortedIndex, next_prefix
+from models.engine.storage import Storage, parse_filters, parse_order
+from models.engine.storage import sort_key
+from models.engine.write_behind import WriteBehind
+import json
+import os
+import threading
+
+
+JOURNAL_MAX_BYTES = 1024 * 1024
+SORT_THRESHOLD = 1000
+
+
+class FileStorage(Storage):
+    """
+    Keeps every object in memory and persists each class to a file.
+
+    Models can list attribute names in `indexed_attributes` to keep a
+    hash index on them, so `search` on those keys doesn't scan every
+    object of the class, and in `sorted_attributes` to keep an ordered
+    index (models/engine/sorted_index.py). `query` plans each call on
+    the smallest index match and walks an ordered index instead of
+    sorting when that is cheaper.
+
+    `load` streams the file and keeps each entry as a raw record; the
+    object is only built the first time `get` or `search` returns it.
+
+    With STORAGE_MODE=journal, `save` and `remove` append one record to
+    `.db_<Class>.journal` instead of rewriting `.db_<Class>.json`; the
+    journal is folded into the snapshot once it grows past
+    STORAGE_JOURNAL_MAX_BYTES.
+
+    With STORAGE_WRITE_BEHIND=1, snapshot writes are left to a background
+    thread that flushes every STORAGE_FLUSH_MS (50 by default); set
+    STORAGE_DURABILITY=sync to make `save` wait until its write is on disk.
+
+    With STORAGE_FORMAT=binary, objects live in `.db_<Class>.bin` instead
+    (see models/engine/binary_store.py, which also converts existing JSON
+    files): `save` appends one record, `remove` tombstones it in place
+    and loading only reads the ids and indexed attributes.
+
+    Each class has its own lock around its objects and indexes, and its
+    own writer lock so only one thread at a time writes its files.
+    Writers copy the ids under the class lock and serialize outside it,
+    so readers and other classes are never blocked by disk I/O.
+    """
+    def __init__(self):
+        """ Initialize the in-memory store
+        """
+        self.data = {}
+        self.raw = {}
+        self.layouts = {}
+        self.indexes = {}
+        self.stores = {}
+        self.write_behind = None
+        self.locks = {}
+        self.writers = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, cls: type) -> threading.RLock:
+        """ Return the lock guarding the objects and indexes of the class
+        """
+        lock = self.locks.get(cls.__name__)
+        if lock is None:
+            with self._locks_lock:
+                lock = self.locks.setdefault(cls.__name__, threading.RLock())
+        return lock
+
+    def _writer(self, cls: type) -> threading.Lock:
+        """ Return the lock serializing the file writes of the class
+        """
+        lock = self.writers.get(cls.__name__)
+        if lock is None:
+            with self._locks_lock:
+                lock = self.writers.setdefault(cls.__name__,
+                                               threading.Lock())
+        return lock
+
+    def _data(self, cls: type) -> dict:
+        """ Return the {id: object} dictionary of the class
+        """
+        s_class = cls.__name__
+        if self.data.get(s_class) is None:
+            self.data[s_class] = {}
+        return self.data[s_class]
+
+    def _raw(self, cls: type) -> dict:
+        """ Return the {id: raw record} dictionary of the class
+        """
+        s_class = cls.__name__
+        if self.raw.get(s_class) is None:
+            self.raw[s_class] = {}
+        return self.raw[s_class]
+
+    def _journaled(self, cls: type) -> bool:
+        """ True when writes of the class go to the append-only journal
+        """
+        return cls.journaled or getenv("STORAGE_MODE") == "journal"
+
+    def _binary(self) -> bool:
+        """ True when objects are kept in the binary record file
+        """
+        return getenv("STORAGE_FORMAT") == "binary"
+
+    def _store(self, cls: type) -> BinaryStore:
+        """ Return the binary record file of the class, opening it once
+        """
+        s_class = cls.__name__
+        if self.stores.get(s_class) is None:
+            file_path = ".db_{}.bin".format(s_class)
+            self.stores[s_class] = BinaryStore(file_path)
+        return self.stores[s_class]
+
+    def _key(self, obj: TypeVar('Base')) -> dict:
+        """ The id and indexed attributes stored in a binary record key
+        """
+        key = {'id': obj.id}
+        for attr in self._indexed_names(obj.__class__):
+            key[attr] = sort_key(getattr(obj, attr, None))
+        return key
+
+    def _write_behind(self) -> WriteBehind:
+        """ Return the shared flusher, or None when writes are synchronous
+        """
+        if getenv("STORAGE_WRITE_BEHIND") != "1":
+            return None
+        if self.write_behind is None:
+            interval = int(getenv("STORAGE_FLUSH_MS", 50)) / 1000
+            self.write_behind = WriteBehind(interval)
+        return self.write_behind
+
+    def _persist(self, op: str, obj: TypeVar('Base')):
+        """ Record a save/remove on disk the way the storage mode asks
+        """
+        cls = obj.__class__
+        if self._binary():
+            # under the writer lock, so a compaction never replaces the
+            # file between its snapshot and this record
+            with self._writer(cls):
+                store = self._store(cls)
+                if op == 'save':
+                    store.put(self._key(obj), obj.to_json(True))
+                else:
+                    store.delete(obj.id)
+                compact = store.dead_bytes > max(store.live_bytes,
+                                                 JOURNAL_MAX_BYTES)
+            if compact:
+                cls.save_to_file()
+            return
+        if self._journaled(cls):
+            self.append_to_journal(op, obj)
+            return
+        flusher = self._write_behind()
+        if flusher is None:
+            cls.save_to_file()
+        else:
+            wait = getenv("STORAGE_DURABILITY") == "sync"
+            flusher.mark_dirty(cls, wait)
+
+    def flush(self):
+        """ Write out everything the background flusher still holds
+        """
+        if self.write_behind is not None:
+            self.write_behind.flush()
+
+    def _store_raw(self, cls: type, obj_id: str, obj_json: dict):
+        """ Keep a loaded entry as a raw record until it is asked for
+        """
+        keys = tuple(obj_json.keys())
+        layout = self.layouts.setdefault(keys, keys)
+        self._data(cls).pop(obj_id, None)
+        self._raw(cls)[obj_id] = (layout, tuple(obj_json.values()))
+        self._index_add(cls, obj_id, obj_json)
+
+    def _hydrate(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """ Build the object of a raw record and move it to the data
+        """
+        with self._lock(cls):
+            record = self._raw(cls).get(obj_id)
+            if record is None:
+                return self._data(cls).get(obj_id)
+            obj = cls(**self._raw_json(obj_id, record))
+            self._data(cls)[obj_id] = obj
+            del self._raw(cls)[obj_id]
+            return obj
+
+    def _raw_json(self, obj_id: str, record) -> dict:
+        """ Return the JSON dictionary of a raw record
+        """
+        if isinstance(record, BinaryStore):
+            return record.get(obj_id)
+        layout, values = record
+        return dict(zip(layout, values))
+
+    def load(self, cls: type):
+        """ Load all objects from file, then replay the journal
+        """
+        with self._writer(cls), self._lock(cls):
+            self._load(cls)
+
+    def _load(self, cls: type):
+        """ Body of load, run under the class locks
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        self.data[s_class] = {}
+        self.raw[s_class] = {}
+        self.indexes.pop(s_class, None)
+        if self._binary():
+            if self.stores.get(s_class) is not None:
+                self.stores.pop(s_class).close()
+            store = self._store(cls)
+            names = self._indexed_names(cls)
+            for obj_id, key in store.keys.items():
+                self.raw[s_class][obj_id] = store
+                if any(name not in key for name in names):
+                    # key written without this attribute (by an older
+                    # version or the converter): read the whole record
+                    key = store.get(obj_id)
+                self._index_add(cls, obj_id, key)
+            return
+
+        if path.exists(file_path):
+            with open(file_path, 'r') as f:
+                for obj_id, obj_json in iter_items(f):
+                    self._store_raw(cls, obj_id, obj_json)
+
+        journal_path = ".db_{}.journal".format(s_class)
+        if not path.exists(journal_path):
+            return
+
+        good = 0
+        with open(journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError
+                    record = json.loads(line)
+                except ValueError:
+                    # torn last line from a crash mid-append
+                    break
+                good += len(line)
+                self._index_discard(cls, record.get('id'))
+                if record.get('op') == 'save':
+                    self._store_raw(cls, record.get('id'), record.get('obj'))
+                else:
+                    self.data[s_class].pop(record.get('id'), None)
+                    self.raw[s_class].pop(record.get('id'), None)
+        if good < path.getsize(journal_path):
+            # cut the torn tail, or the next records appended after it
+            # would be lost on the next load
+            os.truncate(journal_path, good)
+
+    def save_to_file(self, cls: type):
+        """ Save all objects to file, and empty the journal they now
+        contain
+        """
+        s_class = cls.__name__
+        with self._writer(cls):
+            if self._binary():
+                self._store(cls).rewrite(self._records(cls))
+                return
+
+            file_path = ".db_{}.json".format(s_class)
+            with self._lock(cls):
+                objs = list(self._data(cls).items())
+                raws = list(self._raw(cls).items())
+            objs_json = {}
+            for obj_id, obj in objs:
+                objs_json[obj_id] = obj.to_json(True)
+            for obj_id, record in raws:
+                objs_json[obj_id] = self._raw_json(obj_id, record)
+
+            tmp_path = "{}.tmp".format(file_path)
+            with open(tmp_path, 'w') as f:
+                json.dump(objs_json, f)
+            os.replace(tmp_path, file_path)
+
+            journal_path = ".db_{}.journal".format(s_class)
+            if path.exists(journal_path):
+                os.remove(journal_path)
+
+    def _records(self, cls: type) -> Iterable[tuple]:
+        """ Yield (key, JSON dictionary) for every object of the class
+        """
+        with self._lock(cls):
+            objs = list(self._data(cls).values())
+            raws = list(self._raw(cls).items())
+        for obj in objs:
+            yield self._key(obj), obj.to_json(True)
+        for obj_id, record in raws:
+            obj_json = self._raw_json(obj_id, record)
+            key = {'id': obj_id}
+            for attr in self._indexed_names(cls):
+                key[attr] = obj_json.get(attr)
+            yield key, obj_json
+
+    def append_to_journal(self, op: str, obj: TypeVar('Base')):
+        """ Append one save/remove record to the journal, compacting it
+        into a new snapshot when it gets too big
+        """
+        cls = obj.__class__
+        journal_path = ".db_{}.journal".format(cls.__name__)
+        record = {'op': op, 'id': obj.id}
+        if op == 'save':
+            record['obj'] = obj.to_json(True)
+
+        with self._writer(cls):
+            with open(journal_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+                size = f.tell()
+
+        max_bytes = int(getenv("STORAGE_JOURNAL_MAX_BYTES", JOURNAL_MAX_BYTES))
+        if size > max_bytes:
+            cls.save_to_file()
+
+    def save(self, obj: TypeVar('Base')):
+        """ Save an object
+        """
+        cls = obj.__class__
+        with self._lock(cls):
+            self._index_discard(cls, obj.id)
+            self._raw(cls).pop(obj.id, None)
+            self._data(cls)[obj.id] = obj
+            self._index_add(cls, obj.id, obj)
+        self._persist('save', obj)
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Remove an object
+        """
+        cls = obj.__class__
+        with self._lock(cls):
+            raw = self._raw(cls).pop(obj.id, None)
+            obj_found = self._data(cls).pop(obj.id, None)
+            if obj_found is None and raw is None:
+                return
+            self._index_discard(cls, obj.id)
+        self._persist('remove', obj)
+
+    def discard(self, cls: type, ids: List[str]) -> int:
+        """ Drop objects from memory only, see Storage.discard
+        """
+        dropped = 0
+        with self._lock(cls):
+            for obj_id in ids:
+                raw = self._raw(cls).pop(obj_id, None)
+                obj = self._data(cls).pop(obj_id, None)
+                if obj is not None or raw is not None:
+                    self._index_discard(cls, obj_id)
+                    dropped += 1
+        return dropped
+
+    def file_size(self, cls: type) -> int:
+        """ Size of the snapshot, journal and binary files of the class
+        """
+        size = 0
+        for ext in ('json', 'journal', 'bin'):
+            file_path = ".db_{}.{}".format(cls.__name__, ext)
+            if path.exists(file_path):
+                size += path.getsize(file_path)
+        return size
+
+    def count(self, cls: type) -> int:
+        """ Count all objects
+        """
+        return len(self._data(cls).keys()) + len(self._raw(cls))
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        obj = self._data(cls).get(id)
+        if obj is None and id in self._raw(cls):
+            obj = self._hydrate(cls, id)
+        return obj
+
+    def _indexed_names(self, cls: type) -> Tuple[str]:
+        """ Attributes with a hash or an ordered index
+        """
+        names = cls.indexed_attributes + cls.sorted_attributes
+        return tuple(dict.fromkeys(names))
+
+    def _indexes(self, cls: type) -> dict:
+        """ Return the indexes of the class:
+        - 'hash': {attr: {value: ids}}, where ids is a single id or a set
+          of them when the value is shared
+        - 'sorted': {attr: SortedIndex}
+        - 'keys': {id: indexed values}, to find an object's old entries
+        """
+        s_class = cls.__name__
+        indexes = self.indexes.get(s_class)
+        if indexes is None:
+            indexes = {'hash': {}, 'sorted': {}, 'keys': {}}
+            self.indexes[s_class] = indexes
+        for attr in cls.indexed_attributes:
+            if attr not in indexes['hash']:
+                indexes['hash'][attr] = {}
+        for attr in cls.sorted_attributes:
+            if attr not in indexes['sorted']:
+                indexes['sorted'][attr] = SortedIndex()
+        return indexes
+
+    def _index_add(self, cls: type, obj_id: str, values):
+        """ Add an object to every index of the class; values is the
+        object itself or its raw dict
+        """
+        indexes = self._indexes(cls)
+        indexed = []
+        for attr in self._indexed_names(cls):
+            if isinstance(values, dict):
+                value = values.get(attr)
+            else:
+                value = getattr(values, attr, None)
+            indexed.append(value)
+            try:
+                if attr in indexes['hash']:
+                    self._hash_add(indexes['hash'][attr], value, obj_id)
+                if attr in indexes['sorted']:
+                    indexes['sorted'][attr].add(value, obj_id)
+            except TypeError:
+                continue
+        indexes['keys'][obj_id] = tuple(indexed)
+
+    def _hash_add(self, index: dict, value, obj_id: str):
+        """ Add obj_id under value in a hash index
+        """
+        ids = index.get(value)
+        if ids is None:
+            index[value] = obj_id
+        elif isinstance(ids, set):
+            ids.add(obj_id)
+        elif ids != obj_id:
+            index[value] = {ids, obj_id}
+
+    def _index_discard(self, cls: type, obj_id: str):
+        """ Remove an object from every index of the class, using the
+        values it was indexed with (they may have changed since)
+        """
+        indexes = self._indexes(cls)
+        values = indexes['keys'].pop(obj_id, ())
+        for attr, value in zip(self._indexed_names(cls), values):
+            try:
+                if attr in indexes['hash']:
+                    self._hash_discard(indexes['hash'][attr], value, obj_id)
+                if attr in indexes['sorted']:
+                    indexes['sorted'][attr].discard(value, obj_id)
+            except TypeError:
+                continue
+
+    def _hash_discard(self, index: dict, value, obj_id: str):
+        """ Remove obj_id from under value in a hash index
+        """
+        ids = index.get(value)
+        if isinstance(ids, set):
+            ids.discard(obj_id)
+            if len(ids) == 1:
+                index[value] = ids.pop()
+        elif ids is not None and ids == obj_id:
+            del index[value]
+
+    def _hash_ids(self, index: dict, value) -> tuple:
+        """ Ids under value in a hash index
+        """
+        ids = index.get(value, ())
+        if isinstance(ids, set):
+            return tuple(ids)
+        if not isinstance(ids, tuple):
+            return (ids,)
+        return ids
+
+    def _plan(self, cls: type, predicates: list,
+              order_by: str) -> Iterable[str]:
+        """ Pick the cheapest way to list candidate ids: a hash index
+        bucket, an ordered index range, or every id. Returns the ids,
+        already in order_by order.
+        """
+        with self._lock(cls):
+            return self._plan_locked(cls, predicates, order_by)
+
+    def _plan_locked(self, cls: type, predicates: list,
+                     order_by: str) -> Iterable[str]:
+        """ Body of _plan, run under the class lock
+        """
+        indexes = self._indexes(cls)
+        attr_order, desc = parse_order(order_by)
+        best = None
+        best_size = self.count(cls)
+        best_range = None
+        ordered = None
+
+        for attr, op, value in predicates:
+            ids = None
+            try:
+                if attr in indexes['hash'] and op == 'eq':
+                    ids = self._hash_ids(indexes['hash'][attr], value)
+                elif attr in indexes['hash'] and op == 'in':
+                    ids = set()
+                    for v in value:
+                        ids.update(self._hash_ids(indexes['hash'][attr], v))
+                elif attr in indexes['sorted'] and op == 'eq' \
+                        and value is None:
+                    ids = tuple(indexes['sorted'][attr].none_ids)
+            except TypeError:
+                continue
+            if ids is not None and len(ids) < best_size:
+                best, best_size = ids, len(ids)
+
+        for attr, index in indexes['sorted'].items():
+            bounds = self._bounds(index, attr, predicates)
+            if bounds is None:
+                continue
+            start, end = bounds
+            if attr == attr_order:
+                ordered = (index, start, end)
+            if end - start < best_size:
+                best, best_size = None, end - start
+                best_range = (index, start, end)
+
+        if attr_order is None:
+            return self._candidates(cls, best, best_range)
+
+        index = indexes['sorted'].get(attr_order)
+        if index is not None and best_size > SORT_THRESHOLD:
+            if ordered is None:
+                return index.ids(reverse=desc, with_none=True)
+            index, start, end = ordered
+            return index.ids(start, end, reverse=desc)
+
+        best = self._candidates(cls, best, best_range)
+        objs = [self.get(cls, obj_id) for obj_id in best]
+
+        def _key(obj):
+            value = sort_key(getattr(obj, attr_order, None))
+            return (value is not None, value, obj.id)
+        try:
+            objs.sort(key=_key, reverse=desc)
+        except TypeError:
+            pass
+        return [obj.id for obj in objs if obj is not None]
+
+    def _candidates(self, cls: type, best: Iterable[str],
+                    best_range: tuple) -> Iterable[str]:
+        """ Ids of the chosen plan: the ids found in a hash index, the
+        (index, start, end) range of an ordered index, or every id. The
+        range is only walked here, once it is chosen.
+        """
+        if best_range is not None:
+            index, start, end = best_range
+            return index.ids(start, end)
+        if best is None:
+            return list(self._data(cls)) + list(self._raw(cls))
+        return best
+
+    def _bounds(self, index: SortedIndex, attr: str,
+                predicates: list) -> Tuple[int, int]:
+        """ Range of index matching every range-like predicate on attr,
+        None when there is none
+        """
+        start, end = None, None
+        for p_attr, op, value in predicates:
+            if p_attr != attr or value is None:
+                continue
+            try:
+                if op == 'eq':
+                    lo, hi = index.bounds(value, True, value, True)
+                elif op in ('gt', 'gte'):
+                    lo, hi = index.bounds(low=value,
+                                          low_inclusive=op == 'gte')
+                elif op in ('lt', 'lte'):
+                    lo, hi = index.bounds(high=value,
+                                          high_inclusive=op == 'lte')
+                elif op == 'startswith' and isinstance(value, str) \
+                        and value:
+                    lo, hi = index.bounds(value, True,
+                                          next_prefix(value), False)
+                else:
+                    continue
+            except TypeError:
+                continue
+            start = lo if start is None else max(start, lo)
+            end = hi if end is None else min(end, hi)
+        if start is None:
+            return None
+        return start, max(start, end)
+
+    def query(self, cls: type, filters: dict = {}, order_by: str = None,
+              limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Stream the objects matching filters, see Storage.query
+        """
+        predicates = parse_filters(filters)
+        ids = self._plan(cls, predicates, order_by)
+        return self._run(cls, ids, predicates, limit)
+
+    def _run(self, cls: type, ids: Iterable[str], predicates: list,
+             limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Yield the objects of ids that match every predicate
+        """
+        if limit is not None and limit <= 0:
+            return
+        found = 0
+        for obj_id in ids:
+            obj = self.get(cls, obj_id)
+            if obj is None or not self.matches(obj, predicates):
+                continue
+            yield obj
+            found += 1
+            if limit is not None and found >= limit:
+                return
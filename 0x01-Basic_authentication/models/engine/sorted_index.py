@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+""" Ordered index over one attribute of a model
+"""
+from typing import Iterator, Tuple
+from bisect import bisect_left, insort
+from models.engine.storage import sort_key
+import threading
+
+
+CHUNK = 256
+
+
+def next_prefix(prefix: str) -> str:
+    """ Smallest string greater than every string starting with prefix
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SortedIndex():
+    """ Sorted list of (value, id) pairs, with the ids of None values
+    kept apart (they sort first)
+
+    Entries added before the first lookup are only appended and sorted
+    once by that lookup, so loading a file stays O(n log n); later ones
+    are inserted in place.
+
+    `ids` walks a snapshot of the entries: a change made while a walk
+    of the current list is still running copies the list instead of
+    editing it in place. Walks count themselves in `walkers` until they
+    finish or are closed; a walk never started keeps counting until the
+    next change, which then copies once.
+    """
+
+    def __init__(self):
+        """ Initialize an empty index
+        """
+        self.entries = []
+        self.none_ids = set()
+        self.is_sorted = True
+        self.was_read = False
+        self.walkers = 0
+        self.walkers_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """ Number of indexed ids
+        """
+        return len(self.entries) + len(self.none_ids)
+
+    def _own(self):
+        """ Copy the entries before a change if a walk still reads them
+        """
+        if self.walkers:
+            with self.walkers_lock:
+                self.entries = list(self.entries)
+                self.walkers = 0
+
+    def _sort(self):
+        """ Sort the entries appended since the last lookup
+        """
+        self.was_read = True
+        if not self.is_sorted:
+            self._own()
+            self.entries.sort()
+            self.is_sorted = True
+
+    def add(self, value, obj_id: str):
+        """ Index obj_id under value
+        """
+        value = sort_key(value)
+        if value is None:
+            self.none_ids.add(obj_id)
+            return
+        self._own()
+        if self.was_read:
+            insort(self.entries, (value, obj_id))
+        else:
+            self.entries.append((value, obj_id))
+            self.is_sorted = False
+
+    def discard(self, value, obj_id: str):
+        """ Remove obj_id from under value
+        """
+        value = sort_key(value)
+        if value is None:
+            self.none_ids.discard(obj_id)
+            return
+        self._sort()
+        i = bisect_left(self.entries, (value, obj_id))
+        if i < len(self.entries) and self.entries[i] == (value, obj_id):
+            self._own()
+            del self.entries[i]
+
+    def bounds(self, low=None, low_inclusive: bool = True,
+               high=None, high_inclusive: bool = True) -> Tuple[int, int]:
+        """ Positions [start, end) of the entries between low and high,
+        None meaning unbounded
+        """
+        self._sort()
+        entries = self.entries
+        start = 0
+        end = len(entries)
+        if low is not None:
+            low = sort_key(low)
+            start = bisect_left(entries, (low,))
+            if not low_inclusive:
+                while start < end and entries[start][0] == low:
+                    start += 1
+        if high is not None:
+            high = sort_key(high)
+            end = bisect_left(entries, (high,), start)
+            if high_inclusive:
+                while end < len(entries) and entries[end][0] == high:
+                    end += 1
+        return start, max(start, end)
+
+    def ids(self, start: int = 0, end: int = None,
+            reverse: bool = False, with_none: bool = False) -> Iterator[str]:
+        """ Ids of entries[start:end] in order, read from a snapshot of
+        the index taken now, a chunk at a time
+        """
+        self._sort()
+        with self.walkers_lock:
+            self.walkers += 1
+        if end is None:
+            end = len(self.entries)
+        none_ids = sorted(self.none_ids, reverse=reverse) if with_none \
+            else []
+        return self._walk(self.entries, none_ids, start, end, reverse)
+
+    def _walk(self, entries: list, none_ids: list, start: int, end: int,
+              reverse: bool) -> Iterator[str]:
+        """ Yield the ids of entries[start:end], then none_ids
+        (before them when ascending)
+        """
+        try:
+            yield from self._walk_ids(entries, none_ids, start, end,
+                                      reverse)
+        finally:
+            with self.walkers_lock:
+                if entries is self.entries and self.walkers > 0:
+                    self.walkers -= 1
+
+    @staticmethod
+    def _walk_ids(entries: list, none_ids: list, start: int, end: int,
+                  reverse: bool) -> Iterator[str]:
+        """ Body of _walk
+        """
+        if not reverse:
+            yield from none_ids
+        if reverse:
+            for hi in range(end, start, -CHUNK):
+                chunk = entries[max(start, hi - CHUNK):hi]
+                for value, obj_id in reversed(chunk):
+                    yield obj_id
+        else:
+            for lo in range(start, end, CHUNK):
+                for value, obj_id in entries[lo:min(end, lo + CHUNK)]:
+                    yield obj_id
+        if reverse:
+            yield from none_ids
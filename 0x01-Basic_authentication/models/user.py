@@ -8,6 +8,9 @@ from models.base import Base
 class User(Base):
     """ User class
     """
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+    indexed_attributes = ('email',)
+    sorted_attributes = ('email', 'created_at')
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
@@ -3,6 +3,7 @@
 Route module for the API
 """
 from os import getenv
+from api.v1.auth.path_matcher import PathMatcher
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
@@ -13,6 +14,9 @@ app = Flask(__name__)
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 auth = None
+excluded_paths = PathMatcher(['/api/v1/status/', '/api/v1/unauthorized/',
+                              '/api/v1/forbidden/',
+                              '/api/v1/auth_session/login/'])
 
 
 if getenv("AUTH_TYPE") == "basic_auth":
@@ -27,6 +31,9 @@ elif getenv("AUTH_TYPE") == "session_exp_auth":
 elif getenv("AUTH_TYPE") == "session_db_auth":
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
+elif getenv("AUTH_TYPE") == "session_token_auth":
+    from api.v1.auth.session_token_auth import SessionTokenAuth
+    auth = SessionTokenAuth()
 else:
     from api.v1.auth.auth import Auth
     auth = Auth()
@@ -38,17 +45,14 @@ def handle_request() -> None:
     filter the request first before sending it.
     """
     if auth:
-        exclu = ['/api/v1/status/', '/api/v1/unauthorized/',
-                 '/api/v1/forbidden/', '/api/v1/auth_session/login/']
-
-        if auth.require_auth(request.path, exclu):
+        if auth.require_auth(request.path, excluded_paths):
             auth_head = auth.authorization_header(request)
             auth_cook = auth.session_cookie(request)
             if not auth_head and not auth_cook:
                 abort(401)
-            if not auth.current_user(request):
+            request.current_user = auth.request_user(request)
+            if not request.current_user:
                 abort(403)
-            request.current_user = auth.current_user(request)
 
 
 @app.errorhandler(404)
@@ -1,11 +1,35 @@
 #!/usr/bin/env python3
 """ file that setup authentication for users
 """
-from flask import request
-from typing import List, TypeVar
+from api.v1.auth.path_matcher import PathMatcher, compile_paths
+from typing import Callable, List, TypeVar
 from os import getenv
 
 
+def request_memo(req, name: str, resolve: Callable):
+    """
+    resolve(req) once per request: the result is kept in the WSGI
+    environ of the request, so every auth step of the request reuses it
+    and it never outlives the request. Objects without an environ are
+    resolved every time.
+
+    Args:
+        req: the request object
+        name (str): name of the value in the environ
+        resolve (Callable): computes the value from the request
+
+    Returns:
+        the value
+    """
+    environ = getattr(req, 'environ', None)
+    if not isinstance(environ, dict):
+        return resolve(req)
+    name = 'api.auth.' + name
+    if name not in environ:
+        environ[name] = resolve(req)
+    return environ[name]
+
+
 class Auth:
     """
     Module that handles authentication for user using Basic Authentication
@@ -16,7 +40,8 @@ class Auth:
         fetch the path and validate it
         Args:
             path (str): required path
-            excluded_paths (List[str]): list of paths
+            excluded_paths (List[str]): list of paths, or a PathMatcher
+            compiled once from them
 
         Returns:
             bool: True if valid or False if not
@@ -24,12 +49,9 @@ class Auth:
         if not path or not excluded_paths:
             return True
 
-        for i in excluded_paths:
-            if i.endswith('*') and path.startswith(i[:-1]):
-                return False
-            elif i in {path, path + '/'}:
-                return False
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = compile_paths(tuple(excluded_paths))
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -42,10 +64,11 @@ class Auth:
         Returns:
             str: string
         """
-        if not request or "Authorization" not in request.headers:
+        if not request:
             return None
 
-        return request.headers.get("Authorization")
+        return request_memo(request, 'authorization_header',
+                            lambda req: req.headers.get("Authorization"))
 
     def current_user(self, request=None) -> TypeVar('User'):
         """
@@ -59,6 +82,41 @@ class Auth:
         """
         return None
 
+    def stats(self) -> dict:
+        """
+        counters of the authentication, added to GET /api/v1/stats.
+
+        Returns:
+            dict: the counters
+        """
+        return {}
+
+    def destroy_all_sessions(self, user_id: str = None) -> int:
+        """
+        deletes every session of a user.
+
+        Args:
+            user_id (str, optional): the user id. Defaults to None.
+        Returns:
+            int: the number of sessions deleted
+        """
+        return 0
+
+    def request_user(self, request=None) -> TypeVar('User'):
+        """
+        current_user, resolved once per request.
+
+        Args:
+            request ([type], optional): flask request object.
+            Defaults to None.
+        Returns:
+            TypeVar('User'): the authenticated user object
+        """
+        if not request:
+            return None
+
+        return request_memo(request, 'current_user', self.current_user)
+
     def session_cookie(self, request=None) -> str:
         """
         get the cookie from the client browser.
@@ -74,6 +132,6 @@ class Auth:
 
         cookie_name = getenv('SESSION_NAME')
         if cookie_name:
-            cookie = request.cookies.get(cookie_name)
-            return cookie
+            return request_memo(request, 'session_cookie',
+                                lambda req: req.cookies.get(cookie_name))
         return None
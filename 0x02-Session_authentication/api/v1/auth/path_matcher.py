@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+""" File that compiles the excluded paths of the authentication
+"""
+from functools import lru_cache
+from typing import List, Tuple
+
+
+EXACT = 0
+PREFIX = 1
+
+
+class PathMatcher:
+    """
+    Excluded paths compiled into a character trie.
+
+    A pattern ending with `*` matches every path starting with what
+    comes before it; any other pattern matches the same path with or
+    without a trailing slash. A lookup walks the path once, whatever the
+    number of patterns, and the results of the last `cache_size` paths
+    are memoized.
+    """
+    def __init__(self, patterns: List[str], cache_size: int = 1024):
+        """
+        compile the patterns
+
+        Args:
+            patterns (List[str]): the excluded paths
+            cache_size (int): number of paths whose result is kept
+        """
+        self.patterns = list(patterns)
+        self.root = {}
+        for pattern in self.patterns:
+            if pattern.endswith('*'):
+                key, flag = pattern[:-1], PREFIX
+            elif pattern.endswith('/'):
+                key, flag = pattern[:-1], EXACT
+            else:
+                key, flag = pattern, EXACT
+            node = self.root
+            for char in key:
+                node = node.setdefault(char, {})
+            node[flag] = True
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def __len__(self) -> int:
+        """ number of patterns
+        """
+        return len(self.patterns)
+
+    def _match(self, path: str) -> bool:
+        """
+        check a path against every pattern
+
+        Args:
+            path (str): the request path
+
+        Returns:
+            bool: True if a pattern matches the path
+        """
+        end = len(path) - 1 if path.endswith('/') else len(path)
+        node = self.root
+        for i, char in enumerate(path):
+            if PREFIX in node or (i == end and EXACT in node):
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return PREFIX in node or (EXACT in node and end == len(path))
+
+
+@lru_cache(maxsize=32)
+def compile_paths(patterns: Tuple[str]) -> PathMatcher:
+    """
+    matcher of a list of excluded paths, compiled once per list
+
+    Args:
+        patterns (Tuple[str]): the excluded paths
+
+    Returns:
+        PathMatcher: the compiled paths
+    """
+    return PathMatcher(patterns)
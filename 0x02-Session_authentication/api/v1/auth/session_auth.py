@@ -2,19 +2,33 @@
 """ File that create a Session Authentication Model
 """
 from api.v1.auth.auth import Auth
+from os import getenv
 from uuid import uuid4
 from typing import TypeVar
 from models.user import User
+import threading
 
 
 class SessionAuth(Auth):
     """
     Implementation of Session Authentication Model
 
+    `session_ids_by_user_id` indexes the sessions of each user, oldest
+    first, so a user's sessions are counted or revoked without scanning
+    every session. A user keeps at most SESSION_MAX_PER_USER sessions
+    (0 for no limit); a new login beyond it ends the oldest one.
+
     Args:
         Auth (TypeVar('Auth')): the authentication model
     """
     user_id_by_session_id = {}
+    session_ids_by_user_id = {}
+    sessions_lock = threading.RLock()
+
+    def __init__(self):
+        """ initialze the variable
+        """
+        self.max_sessions = int(getenv('SESSION_MAX_PER_USER', 0))
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -30,9 +44,69 @@ class SessionAuth(Auth):
             return None
 
         sess_id = str(uuid4())
-        self.user_id_by_session_id[sess_id] = user_id
+        with self.sessions_lock:
+            self.user_id_by_session_id[sess_id] = user_id
+            sessions = self.session_ids_by_user_id.setdefault(user_id, {})
+            sessions[sess_id] = None
+            while 0 < self.max_sessions < len(sessions):
+                self.remove_session(next(iter(sessions)))
         return sess_id
 
+    def remove_session(self, session_id: str) -> bool:
+        """
+        forget a session and its entry in the user index
+
+        Args:
+            session_id (str): the session id
+
+        Returns:
+            bool: True if the session existed
+        """
+        with self.sessions_lock:
+            value = self.user_id_by_session_id.pop(session_id, None)
+            if value is None:
+                return False
+            user_id = value
+            if isinstance(value, dict):
+                user_id = value.get('user_id')
+            sessions = self.session_ids_by_user_id.get(user_id)
+            if sessions is not None:
+                sessions.pop(session_id, None)
+                if not sessions:
+                    del self.session_ids_by_user_id[user_id]
+        return True
+
+    def count_sessions(self, user_id: str = None) -> int:
+        """
+        number of sessions of a user
+
+        Args:
+            user_id (str, optional): the user id. Defaults to None.
+
+        Returns:
+            int: the number of sessions
+        """
+        return len(self.session_ids_by_user_id.get(user_id, ()))
+
+    def destroy_all_sessions(self, user_id: str = None) -> int:
+        """
+        deletes every session of a user / logout everywhere
+
+        Args:
+            user_id (str, optional): the user id. Defaults to None.
+
+        Returns:
+            int: the number of sessions deleted
+        """
+        if not user_id:
+            return 0
+
+        with self.sessions_lock:
+            sessions = list(self.session_ids_by_user_id.get(user_id, ()))
+            for sess_id in sessions:
+                self.remove_session(sess_id)
+        return len(sessions)
+
     def user_id_for_session_id(self, session_id: str = None) -> str:
         """
         returns a user id based on a session id
@@ -86,5 +160,4 @@ class SessionAuth(Auth):
         if not user_id:
             return False
 
-        del self.user_id_by_session_id[sess_id]
-        return True
+        return self.remove_session(sess_id)
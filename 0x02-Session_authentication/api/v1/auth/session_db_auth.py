@@ -2,16 +2,104 @@
 """ create a db session for authentication
 """
 from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.ttl_cache import TTLCache
+from datetime import datetime, timedelta
 from models.user_session import UserSession
+from os import getenv
+import threading
+import time
 
 
 class SessionDBAuth(SessionExpAuth):
     """
     Save the session in a storage file
 
+    The storage stays the source of truth, but lookups go through a
+    read-through cache of SESSION_CACHE_SIZE session ids (0 to disable)
+    kept SESSION_CACHE_TTL seconds at most and never past the session
+    expiry. Unknown ids are cached too. Another worker's logout is seen
+    once the entry expires.
+
+    With SESSION_DURATION and SESSION_SWEEP_INTERVAL set, a background
+    thread drops the expired sessions every interval, SESSION_SWEEP_BATCH
+    at a time, then rewrites the session file once.
+
     Args:
         SessionExpAuth (_type_): Inherited Model
     """
+    def __init__(self):
+        """ initialze the variable
+        """
+        super().__init__()
+        self.cache = TTLCache(int(getenv('SESSION_CACHE_SIZE', 4096)),
+                              int(getenv('SESSION_CACHE_TTL', 30)))
+        self.sweep_interval = int(getenv('SESSION_SWEEP_INTERVAL', 0))
+        self.sweep_batch = int(getenv('SESSION_SWEEP_BATCH', 1000))
+        self.swept = 0
+        self.sweeps = 0
+        self.sweep_seconds = 0.0
+        self.sweep_stop = threading.Event()
+        if self.sweep_interval > 0 and self.session_duration > 0:
+            threading.Thread(target=self.run_sweeper, daemon=True).start()
+
+    def run_sweeper(self):
+        """
+        sweep the expired sessions every sweep_interval seconds until
+        sweep_stop is set
+        """
+        while not self.sweep_stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:
+                continue
+
+    def sweep(self) -> int:
+        """
+        drop the stored sessions that expired, a batch at a time, and
+        write the session file once
+
+        Returns:
+            int: the number of sessions dropped
+        """
+        if self.session_duration <= 0:
+            return 0
+
+        start = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.session_duration)
+        swept = 0
+        while True:
+            ids = [sess.id for sess in UserSession.query(
+                {'created_at__lt': cutoff}, limit=self.sweep_batch)]
+            dropped = UserSession.discard(ids) if ids else 0
+            if not dropped:
+                break
+            swept += dropped
+        if swept:
+            UserSession.save_to_file()
+        self.swept += swept
+        self.sweeps += 1
+        self.sweep_seconds += time.monotonic() - start
+        return swept
+
+    def cache_session(self, session_id: str, user_sess: UserSession = None):
+        """
+        cache the user id of a session, or that the session is unknown
+
+        Args:
+            session_id (str): the session id
+            user_sess (UserSession, optional): the stored session
+        """
+        if user_sess is None:
+            self.cache.set(session_id, (None,))
+            return
+
+        ttl = None
+        if self.session_duration > 0:
+            expiry = user_sess.created_at + \
+                timedelta(seconds=self.session_duration)
+            ttl = (expiry - datetime.utcnow()).total_seconds()
+        self.cache.set(session_id, (user_sess.user_id,), ttl)
+
     def create_session(self, user_id=None) -> str:
         """
         creates and stores new instance of UserSession and returns
@@ -28,11 +116,71 @@ class SessionDBAuth(SessionExpAuth):
             return None
 
         # create and save the session in a file
-        user_sess = UserSession([user_id, sess_id])
+        user_sess = UserSession(user_id=user_id, session_id=sess_id)
         user_sess.save()
+        self.cache_session(sess_id, user_sess)
+
+        if self.max_sessions > 0:
+            sessions = UserSession.search({'user_id': user_id})
+            sessions.sort(key=lambda sess: (sess.created_at,
+                                            sess.session_id == sess_id))
+            for sess in sessions[:-self.max_sessions]:
+                sess.remove()
+                self.cache.pop(sess.session_id)
 
         return sess_id
 
+    def stats(self) -> dict:
+        """
+        count the sessions in memory, the session cache hits and the
+        sessions swept.
+
+        Returns:
+            dict: the counters
+        """
+        stats = super().stats()
+        stats['session_cache_hits'] = self.cache.hits
+        stats['session_cache_misses'] = self.cache.misses
+        stats['sessions_swept'] = self.swept
+        stats['session_sweeps'] = self.sweeps
+        stats['session_sweep_seconds'] = round(self.sweep_seconds, 3)
+        stats['session_file_bytes'] = UserSession.file_size()
+        return stats
+
+    def count_sessions(self, user_id: str = None) -> int:
+        """
+        number of stored sessions of a user
+
+        Args:
+            user_id (str, optional): the user id. Defaults to None.
+
+        Returns:
+            int: the number of sessions
+        """
+        if not user_id:
+            return 0
+        return len(UserSession.search({'user_id': user_id}))
+
+    def destroy_all_sessions(self, user_id: str = None) -> int:
+        """
+        deletes every stored session of a user / logout everywhere
+
+        Args:
+            user_id (str, optional): the user id. Defaults to None.
+
+        Returns:
+            int: the number of sessions deleted
+        """
+        if not user_id:
+            return 0
+
+        super().destroy_all_sessions(user_id)
+        sessions = UserSession.search({'user_id': user_id})
+        for sess in sessions:
+            sess.remove()
+            self.cache.pop(sess.session_id)
+        return len(sessions)
+
     def user_id_for_session_id(self, session_id=None) -> str:
         """
         returns the user id by requesting UserSession in the database
@@ -43,9 +191,22 @@ class SessionDBAuth(SessionExpAuth):
             Defaults to None.
 
         Returns:
-            str: user id
+            str: user id, None if the session is unknown or expired
         """
+        if not session_id or not isinstance(session_id, str):
+            return None
+
+        cached = self.cache.get(session_id)
+        if cached is not None:
+            return cached[0]
+
         data = UserSession.get(session_id)
+        if data and self.session_duration > 0:
+            expiry = data.created_at + \
+                timedelta(seconds=self.session_duration)
+            if expiry < datetime.utcnow():
+                data = None
+        self.cache_session(session_id, data)
         if not data:
             return None
         return data.user_id
@@ -65,8 +226,12 @@ class SessionDBAuth(SessionExpAuth):
         if not sess_id:
             return False
 
+        self.cache.pop(sess_id)
+        self.remove_session(sess_id)
         data = UserSession.get(sess_id)
         if not data:
             return None
 
         data.remove()
+        self.cache_session(sess_id)
+        return True
@@ -4,16 +4,58 @@
 from os import getenv
 from api.v1.auth.session_auth import SessionAuth
 from datetime import datetime, timedelta
+import heapq
+import threading
 
 
 class SessionExpAuth(SessionAuth):
     """
     This model create an expiration time for the session
+
+    Sessions are also pushed on a min-heap of (expiry, session id), so
+    expired ones are dropped from memory as soon as a session is created
+    or read, in O(log n) each, instead of staying there forever.
     """
     def __init__(self):
         """ initialze the variable
         """
+        super().__init__()
         self.session_duration = int(getenv('SESSION_DURATION', 0))
+        self.expiry_heap = []
+        self.expiry_lock = threading.Lock()
+        self.evicted = 0
+
+    def evict_expired(self):
+        """
+        remove the sessions whose expiry has passed.
+        """
+        if self.session_duration <= 0:
+            return
+
+        now = datetime.now()
+        session_elapsed = timedelta(seconds=self.session_duration)
+        with self.expiry_lock:
+            while self.expiry_heap and self.expiry_heap[0][0] < now:
+                expiry, sess_id = heapq.heappop(self.expiry_heap)
+                session_dict = self.user_id_by_session_id.get(sess_id)
+                if not isinstance(session_dict, dict):
+                    continue
+                created_time = session_dict.get('created_at')
+                if created_time and created_time + session_elapsed < now:
+                    self.remove_session(sess_id)
+                    self.evicted += 1
+
+    def stats(self) -> dict:
+        """
+        count the sessions kept in memory and the ones evicted.
+
+        Returns:
+            dict: the counters
+        """
+        return {
+            'sessions': len(self.user_id_by_session_id),
+            'sessions_evicted': self.evicted,
+        }
 
     def create_session(self, user_id=None) -> str:
         """
@@ -26,14 +68,20 @@ class SessionExpAuth(SessionAuth):
         Returns:
             str: the session id
         """
+        self.evict_expired()
         sess_id = super().create_session(user_id)
         if not sess_id:
             return None
 
+        created_time = datetime.now()
         self.user_id_by_session_id[sess_id] = {
             'user_id': user_id,
-            'created_at': datetime.now()
+            'created_at': created_time
         }
+        if self.session_duration > 0:
+            expiry = created_time + timedelta(seconds=self.session_duration)
+            with self.expiry_lock:
+                heapq.heappush(self.expiry_heap, (expiry, sess_id))
 
         return sess_id
 
@@ -50,6 +98,7 @@ class SessionExpAuth(SessionAuth):
         if not session_id or not isinstance(session_id, str):
             return None
 
+        self.evict_expired()
         session_dict = self.user_id_by_session_id.get(session_id)
         if not session_dict or 'created_at' not in session_dict:
             return None
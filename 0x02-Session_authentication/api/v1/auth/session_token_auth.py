@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+""" create a stateless signed session token authentication
+"""
+from api.v1.auth.session_auth import SessionAuth
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from os import getenv, urandom
+from secrets import token_urlsafe
+import hashlib
+import heapq
+import hmac
+import logging
+import threading
+import time
+
+
+DEFAULT_DURATION = 24 * 3600
+
+
+def b64encode(data: bytes) -> str:
+    """ unpadded urlsafe base64
+    """
+    return urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def b64decode(data: str) -> bytes:
+    """ decode unpadded urlsafe base64
+    """
+    return urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class SessionTokenAuth(SessionAuth):
+    """
+    The session cookie is a token `<payload>.<signature>`: the payload
+    holds the user id, the expiry (SESSION_DURATION seconds after the
+    login, DEFAULT_DURATION if it is not set above 0) and a nonce,
+    signed with HMAC-SHA256 and SESSION_SECRET. Any worker sharing the
+    secret verifies it without a session store; without SESSION_SECRET
+    a random one is used, so only this process accepts its tokens.
+
+    Logging out puts the token signature in a revocation set of this
+    worker until the token expires. The set is neither shared nor kept
+    across restarts, so a revoked token stays usable elsewhere until
+    then: every token expires for that reason.
+    """
+    def __init__(self):
+        """ initialze the variable
+        """
+        self.session_duration = int(getenv('SESSION_DURATION', 0))
+        if self.session_duration <= 0:
+            self.session_duration = DEFAULT_DURATION
+        secret = getenv('SESSION_SECRET')
+        if not secret:
+            logging.getLogger(__name__).warning(
+                "SESSION_SECRET is not set: tokens are only valid in this "
+                "process, until it restarts")
+        self.secret = secret.encode() if secret else urandom(32)
+        self.revoked = {}
+        self.revoked_heap = []
+        self.revoked_lock = threading.Lock()
+
+    def sign(self, payload: str) -> str:
+        """
+        signature of a payload
+
+        Args:
+            payload (str): the encoded payload
+
+        Returns:
+            str: the encoded signature
+        """
+        return b64encode(hmac.new(self.secret, payload.encode(),
+                                  hashlib.sha256).digest())
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        creates a signed token for a user.
+
+        Args:
+            user_id (str, optional): current user id. Defaults to None.
+
+        Returns:
+            str: returns the token
+        """
+        if not user_id or not isinstance(user_id, str):
+            return None
+
+        expiry = int(time.time()) + self.session_duration
+        payload = b64encode('{}:{}:{}'.format(
+            user_id, expiry, token_urlsafe(6)).encode())
+        return '{}.{}'.format(payload, self.sign(payload))
+
+    def verify(self, session_id: str) -> tuple:
+        """
+        check the signature and expiry of a token
+
+        Args:
+            session_id (str): the token
+
+        Returns:
+            tuple: (user id, expiry, signature), None if the token is not
+            valid
+        """
+        if not session_id or not isinstance(session_id, str):
+            return None
+
+        payload, dot, signature = session_id.partition('.')
+        if not dot or not hmac.compare_digest(signature.encode(),
+                                              self.sign(payload).encode()):
+            return None
+        try:
+            user_id, expiry, nonce = b64decode(payload).decode().rsplit(':', 2)
+            expiry = int(expiry)
+        except ValueError:
+            return None
+        if expiry < time.time():
+            return None
+        return user_id, expiry, signature
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        returns the user id of a valid, not revoked token
+
+        Args:
+            session_id (str, optional): the token. Defaults to None.
+
+        Returns:
+            str: the user id of the token
+        """
+        token = self.verify(session_id)
+        if not token:
+            return None
+
+        user_id, expiry, signature = token
+        if signature in self.revoked:
+            return None
+        return user_id
+
+    def destroy_session(self, request=None):
+        """
+        revokes the token of the request / logout
+
+        Args:
+            request (_type_, optional): flask object reques.
+            Defaults to None.
+        """
+        if not request:
+            return False
+
+        token = self.verify(self.session_cookie(request))
+        if not token:
+            return False
+
+        user_id, expiry, signature = token
+        now = time.time()
+        with self.revoked_lock:
+            while self.revoked_heap and self.revoked_heap[0][0] < now:
+                del self.revoked[heapq.heappop(self.revoked_heap)[1]]
+            if signature in self.revoked:
+                return False
+            self.revoked[signature] = expiry
+            heapq.heappush(self.revoked_heap, (expiry, signature))
+        return True
+
+    def stats(self) -> dict:
+        """
+        count the tokens revoked and not expired yet.
+
+        Returns:
+            dict: the counters
+        """
+        return {'revoked_tokens': len(self.revoked)}
@@ -18,11 +18,13 @@ def status() -> str:
 def stats() -> str:
     """ GET /api/v1/stats
     Return:
-      - the number of each objects
+      - the number of each objects, and the counters of the auth
     """
+    from api.v1.app import auth
     from models.user import User
     stats = {}
     stats['users'] = User.count()
+    stats.update(auth.stats())
     return jsonify(stats)
 
 
@@ -22,22 +22,17 @@ def session_login():
         return jsonify({"error": "password missing"}), 400
 
     try:
-        database = User.search()
-        if len(database) == 0:
-            return jsonify({"error": "no user found for this email"}), 404
-
-        for user in database:
-            if user.email == email:
-                if not user.is_valid_password(password):
-                    return jsonify({"error": "wrong password"}), 401
-                else:
-                    from api.v1.app import auth
-                    from os import getenv
-
-                    sess_id = auth.create_session(user.id)
-                    user_data = jsonify(user.to_json())
-                    user_data.set_cookie(getenv('SESSION_NAME'), sess_id)
-                    return user_data
+        for user in User.search({'email': email}):
+            if not user.is_valid_password(password):
+                return jsonify({"error": "wrong password"}), 401
+            else:
+                from api.v1.app import auth
+                from os import getenv
+
+                sess_id = auth.create_session(user.id)
+                user_data = jsonify(user.to_json())
+                user_data.set_cookie(getenv('SESSION_NAME'), sess_id)
+                return user_data
 
         return jsonify({"error": "no user found for this email"}), 404
     except Exception:
@@ -57,3 +52,19 @@ def logout():
     if not auth.destroy_session(request):
         abort(404)
     return jsonify({}), 200
+
+
+@app_views.route('/auth_session/logout_all', methods=['DELETE'])
+def logout_all():
+    """
+    Logout the user from every session.
+
+    Returns:
+        the number of sessions ended, 404 if there was none.
+    """
+    from api.v1.app import auth
+
+    sessions = auth.destroy_all_sessions(request.current_user.id)
+    if not sessions:
+        abort(404)
+    return jsonify({"sessions": sessions}), 200
@@ -2,18 +2,89 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from flask import Response, abort, jsonify, request
 from models.user import User
+from typing import Iterable, Iterator, List
+import json
+
+
+def encode_cursor(user: User) -> str:
+    """ Opaque cursor pointing right after user in the listing
+    """
+    position = [user.to_json()['created_at'], user.id]
+    return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """ (created_at, id) position of a cursor, None if it is invalid
+    """
+    try:
+        created_at, user_id = json.loads(urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(user_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def ndjson_users(users: Iterable[User], fields: List[str]) -> Iterator[str]:
+    """ Serialize users one JSON line at a time
+    """
+    for user in users:
+        yield json.dumps(user.to_json(fields=fields)) + "\n"
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters:
+      - limit (optional): page size
+      - cursor (optional): X-Next-Cursor of the previous page
+      - fields (optional): comma separated attributes to return
+      - stream (optional): 1 to stream, like Accept: application/x-ndjson
     Return:
-      - list of all User objects JSON represented
+      - list of User objects JSON represented, ordered by created_at
+        then id when paginated; X-Next-Cursor is set if more follow
+      - one User JSON per line (application/x-ndjson) when streamed,
+        sent as the users are read
+      - 400 if limit or cursor is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    fields = request.args.get('fields')
+    if fields is not None:
+        fields = [field for field in fields.split(',') if field]
+    stream = request.args.get('stream') == '1' or \
+        request.accept_mimetypes.best_match(
+            ['application/json', 'application/x-ndjson']) == \
+        'application/x-ndjson'
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        if stream:
+            return Response(ndjson_users(User.query(), fields),
+                            mimetype='application/x-ndjson')
+        all_users = [user.to_json(fields=fields) for user in User.all()]
+        return jsonify(all_users)
+
+    if limit is not None:
+        if not limit.isdigit() or int(limit) == 0:
+            return jsonify({'error': "Wrong limit"}), 400
+        limit = int(limit)
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({'error': "Wrong cursor"}), 400
+
+    users = User.page(after, limit + 1 if limit is not None else None)
+    if stream:
+        response = Response(ndjson_users(users[:limit], fields),
+                            mimetype='application/x-ndjson')
+    else:
+        response = jsonify([user.to_json(fields=fields)
+                            for user in users[:limit]])
+    if limit is not None and len(users) > limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(users[limit - 1])
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+""" Benchmark of the memory a User takes, against a dict-backed User
+
+Writes USERS users (100000 by default) to `.db_User.json` in a
+temporary directory and loads its rows, then measures with tracemalloc
+the bytes per user of building them as User (`__slots__`, epoch
+timestamps) and as DictUser, the layout User had before: attributes in
+a `__dict__` and two datetimes per user. The rows stay alive, so the
+field strings both share are not counted.
+
+Usage: python3 bench/memory_users.py
+"""
+from datetime import datetime, timedelta
+from os import getenv, path
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+import uuid
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models.engine.storage import TIMESTAMP_FORMAT  # noqa: E402
+from models.user import User  # noqa: E402
+
+USERS = int(getenv("USERS", 100000))
+BASE = datetime(2024, 1, 1)
+
+
+class DictUser():
+    """ User as it was stored before `__slots__`
+    """
+
+    def __init__(self, *args: list, **kwargs: dict):
+        """ Initialize a DictUser instance
+        """
+        self.id = kwargs.get('id', str(uuid.uuid4()))
+        self.created_at = datetime.strptime(kwargs.get('created_at'),
+                                            TIMESTAMP_FORMAT)
+        self.updated_at = datetime.strptime(kwargs.get('updated_at'),
+                                            TIMESTAMP_FORMAT)
+        self.email = kwargs.get('email')
+        self._password = kwargs.get('_password')
+        self.first_name = kwargs.get('first_name')
+        self.last_name = kwargs.get('last_name')
+
+
+def write_users():
+    """ write the users file, one in ten updated after its creation
+    """
+    rnd = random.Random(0)
+    objs = {}
+    for i in range(USERS):
+        obj_id = str(uuid.UUID(int=rnd.getrandbits(128)))
+        created_at = BASE + timedelta(seconds=rnd.randrange(10 ** 6))
+        updated_at = created_at
+        if i % 10 == 0:
+            updated_at += timedelta(seconds=rnd.randrange(10 ** 5))
+        objs[obj_id] = {"id": obj_id,
+                        "created_at": created_at.strftime(TIMESTAMP_FORMAT),
+                        "updated_at": updated_at.strftime(TIMESTAMP_FORMAT),
+                        "email": "user{}@x.io".format(i),
+                        "_password": "{:064x}".format(rnd.getrandbits(256)),
+                        "first_name": None, "last_name": None}
+    with open(".db_User.json", "w") as f:
+        json.dump(objs, f)
+
+
+def measure(cls: type, rows: list):
+    """ (objects, bytes per object) of building a cls from each row
+    """
+    tracemalloc.start()
+    objs = [cls(**row) for row in rows]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objs, size / len(rows)
+
+
+def main() -> int:
+    """ run the benchmark, 0 if both layouts hold the same users and
+    User is the smaller
+    """
+    write_users()
+    with open(".db_User.json", "r") as f:
+        rows = list(json.load(f).values())
+
+    users, user_bytes = measure(User, rows)
+    dict_users, dict_bytes = measure(DictUser, rows)
+    print("{} users".format(len(rows)))
+    print("{:26} {:5.0f} bytes/user"
+          .format("User (__slots__, epochs)", user_bytes))
+    print("{:26} {:5.0f} bytes/user"
+          .format("DictUser (__dict__)", dict_bytes))
+    print("saved {:.0f}%".format(100 - user_bytes * 100 / dict_bytes))
+
+    fields = ('id', 'created_at', 'updated_at', 'email', '_password',
+              'first_name', 'last_name')
+    same = all(getattr(user, field) == getattr(dict_user, field)
+               for user, dict_user in zip(users, dict_users)
+               for field in fields)
+    failed = not same or user_bytes >= dict_bytes
+    if not same:
+        print("MISMATCH")
+    print("FAILED" if failed else "OK")
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+""" Benchmark of User.query against a full scan of User.all()
+
+Writes USERS users (100000 by default) to `.db_User.json` in a
+temporary directory, times loading it, then times a few admin queries
+with the planner and with a filter over User.all() (every object
+already built), checking that both return the same users.
+
+Usage: python3 bench/query_users.py
+"""
+from datetime import datetime, timedelta
+from os import getenv, path
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())
+
+from models.engine.storage import Storage, parse_filters  # noqa: E402
+from models.engine.storage import sort_key  # noqa: E402
+from models.user import User  # noqa: E402
+
+USERS = int(getenv("USERS", 100000))
+BASE = datetime(2024, 1, 1)
+
+
+def write_users():
+    """ write the users file, created_at spread over ~11 days
+    """
+    rnd = random.Random(0)
+    objs = {}
+    for i in range(USERS):
+        obj_id = str(uuid.UUID(int=rnd.getrandbits(128)))
+        created_at = (BASE + timedelta(seconds=rnd.randrange(10 ** 6)))
+        created_at = created_at.strftime("%Y-%m-%dT%H:%M:%S")
+        email = "{}{}@x.io".format(rnd.choice(["adm", "bob", "carl"]), i)
+        objs[obj_id] = {"id": obj_id, "created_at": created_at,
+                        "updated_at": created_at, "email": email,
+                        "_password": None, "first_name": None,
+                        "last_name": None}
+    with open(".db_User.json", "w") as f:
+        json.dump(objs, f)
+
+
+def full_scan(filters: dict, order_by: str = None, limit: int = None):
+    """ the same query as User.query, filtering every user
+    """
+    predicates = parse_filters(filters)
+    objs = [obj for obj in User.all() if Storage.matches(obj, predicates)]
+    if order_by:
+        attr = order_by.lstrip('-')
+        objs.sort(key=lambda obj: (sort_key(getattr(obj, attr)), obj.id),
+                  reverse=order_by.startswith('-'))
+    return objs[:limit]
+
+
+def timed(function, *args):
+    """ (result, milliseconds) of function(*args)
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    """ run the benchmark, 0 if both ways agree
+    """
+    write_users()
+    result, ms = timed(User.load_from_file)
+    print("load {} users: {:.0f} ms".format(User.count(), ms))
+    # build every object and sort the indexes before timing
+    list(User.query({}, "created_at", 1))
+    list(User.query({}, "email", 1))
+    User.all()
+
+    cases = [
+        ("email prefix", {"email__startswith": "adm12"}, None, None),
+        ("created_at hour, ordered",
+         {"created_at__gte": BASE + timedelta(days=3),
+          "created_at__lt": BASE + timedelta(days=3, hours=1)},
+         "created_at", None),
+        ("latest 50", {}, "-created_at", 50),
+        ("email IN 5",
+         {"email__in": ["adm1@x.io", "bob2@x.io", "bob3@x.io",
+                        "carl4@x.io", "adm5@x.io"]},
+         None, None),
+    ]
+    failed = False
+    for name, filters, order_by, limit in cases:
+        query, query_ms = timed(
+            lambda: list(User.query(filters, order_by, limit)))
+        scan, scan_ms = timed(full_scan, filters, order_by, limit)
+        if order_by is None:
+            same = sorted(o.id for o in query) == sorted(o.id for o in scan)
+        else:
+            same = [o.id for o in query] == [o.id for o in scan]
+        failed = failed or not same
+        print("{:26} rows {:5}  query {:8.2f} ms  full scan {:8.2f} ms{}"
+              .format(name, len(query), query_ms, scan_ms,
+                      "" if same else "  MISMATCH"))
+    print("FAILED" if failed else "OK")
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+""" Stress test of concurrent POST / GET /api/v1/users
+
+THREADS clients (16 by default) each create REQUESTS users (100), read
+each one back and list the users every 10 requests, while another thread
+keeps compacting the User file. Every response must succeed, and every
+user created must be found again once the file is reloaded. Runs in a
+temporary directory with the storage mode of the environment
+(STORAGE_MODE, STORAGE_FORMAT, STORAGE_WRITE_BEHIND...).
+
+Usage: python3 bench/stress_users.py
+"""
+from base64 import b64encode
+from os import getenv, path
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())
+os.environ["AUTH_TYPE"] = "basic_auth"
+
+from models.user import User  # noqa: E402
+
+THREADS = int(getenv("THREADS", 16))
+REQUESTS = int(getenv("REQUESTS", 100))
+HEADERS = {"Authorization": "Basic " + b64encode(b"admin@x.io:pw").decode()}
+
+
+def client(app, number: int, created: list, errors: list):
+    """ create, read and list users from one test client
+    """
+    c = app.test_client()
+    for i in range(REQUESTS):
+        r = c.post("/api/v1/users", headers=HEADERS,
+                   json={"email": "t{}_{}@x.io".format(number, i),
+                         "password": "pw"})
+        if r.status_code != 201:
+            errors.append(("POST", r.status_code))
+            continue
+        user_id = r.get_json()["id"]
+        created.append(user_id)
+        r = c.get("/api/v1/users/" + user_id, headers=HEADERS)
+        if r.status_code != 200:
+            errors.append(("GET", r.status_code))
+        if i % 10 == 0:
+            r = c.get("/api/v1/users", headers=HEADERS)
+            if r.status_code != 200:
+                errors.append(("GET list", r.status_code))
+
+
+def compact(done: threading.Event):
+    """ rewrite the User file until done
+    """
+    while not done.is_set():
+        User.save_to_file()
+        time.sleep(0.01)
+
+
+def main() -> int:
+    """ run the stress test, 0 if everything was kept
+    """
+    admin = User()
+    admin.email = "admin@x.io"
+    admin.password = "pw"
+    admin.save()
+    from api.v1.app import app
+
+    created, errors = [], []
+    done = threading.Event()
+    compactor = threading.Thread(target=compact, args=(done,))
+    clients = [threading.Thread(target=client, args=(app, i, created, errors))
+               for i in range(THREADS)]
+    start = time.perf_counter()
+    compactor.start()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    compactor.join()
+
+    User.flush()
+    in_memory = User.count()
+    User.load_from_file()
+    missing = [user_id for user_id in created if User.get(user_id) is None]
+    print("{} clients, {} users created in {:.1f}s, {} errors {}".format(
+        THREADS, len(created), elapsed, len(errors), errors[:3]))
+    print("in memory {}, after reload {}, missing {}".format(
+        in_memory, User.count(), len(missing)))
+    if errors or missing or in_memory != User.count():
+        print("FAILED")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+""" Crash recovery check of the journal and the binary store
+
+For each, saves a user, appends a torn record as a crash in the middle
+of an append would leave it, reloads, saves two more users and reloads again:
+all three users must be there. Runs in a temporary directory.
+
+Usage: python3 bench/torn_tail.py
+"""
+from os import path
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from models.user import User  # noqa: E402
+
+TORN = {
+    "journal": (".db_User.journal", b'{"op": "save", "id": "x", "obj": {"i'),
+    "binary": (".db_User.bin", b'\x01\x00\x00\x00\x40\x00\x00\x01\x00{"id'),
+}
+
+
+def check(mode: str) -> bool:
+    """ run the scenario with the given storage mode, True if it passes
+    """
+    os.chdir(tempfile.mkdtemp())
+    file_path, torn = TORN[mode]
+    User.load_from_file()
+    for email in ("a@x.io", "b@x.io", "c@x.io"):
+        user = User()
+        user.email = email
+        user.save()
+        if email == "a@x.io":
+            with open(file_path, 'ab') as f:
+                f.write(torn)
+            User.load_from_file()
+    User.load_from_file()
+    emails = sorted(user.email for user in User.all())
+    print("{:8} {}".format(mode, emails))
+    return emails == ["a@x.io", "b@x.io", "c@x.io"]
+
+
+def main() -> int:
+    """ check every mode, 0 if all pass
+    """
+    os.environ["STORAGE_MODE"] = "journal"
+    failed = not check("journal")
+    del os.environ["STORAGE_MODE"]
+    os.environ["STORAGE_FORMAT"] = "binary"
+    failed = not check("binary") or failed
+    print("FAILED" if failed else "OK")
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
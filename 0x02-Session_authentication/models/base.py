@@ -2,39 +2,107 @@
 """ Base module
 """
 from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
-import json
+from typing import TypeVar, List, Iterable, Iterator, Tuple
+from os import getenv
+from models.engine.storage import TIMESTAMP_FORMAT
+import calendar
 import uuid
 
 
-TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+FIELDS = {}
+storage = None
+
+
+if getenv("STORAGE_TYPE") == "sqlite":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
 
 
 class Base():
     """ Base class
+
+    Objects are kept by the storage engine picked with STORAGE_TYPE:
+    `sqlite` for models/engine/db_storage.py, anything else for the
+    in-memory, file-backed models/engine/file_storage.py.
+
+    Subclasses can list attribute names in `indexed_attributes`; the
+    engine indexes them so `search` on those keys doesn't scan every
+    object of the class. Names in `sorted_attributes` get an ordered
+    index, used by `query` for prefix and range filters and ordering;
+    every model has one on `created_at`, which `page` walks.
+
+    Subclasses with `journaled = True` have their saves and removals
+    appended to the file engine's journal whatever STORAGE_MODE is, for
+    models written too often to rewrite their whole file each time.
+
+    Instances use `__slots__` and keep timestamps as integer epochs;
+    `created_at` and `updated_at` are still read and set as datetimes.
+    Subclasses that declare their own `__slots__` stay dict-free.
     """
+    __slots__ = ('id', '_created_at', '_updated_at')
+    indexed_attributes = ()
+    sorted_attributes = ('created_at',)
+    journaled = False
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = datetime.fromisoformat(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
-        if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+        if kwargs.get('updated_at') == kwargs.get('created_at'):
+            # share one int between both timestamps when they match
+            self._updated_at = self._created_at
+        elif kwargs.get('updated_at') is not None:
+            self.updated_at = datetime.fromisoformat(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
+    @property
+    def created_at(self) -> datetime:
+        """ Getter of the creation time
+        """
+        return datetime.utcfromtimestamp(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        """ Setter of the creation time, stored as an epoch
+        """
+        self._created_at = calendar.timegm(value.utctimetuple())
+
+    @property
+    def updated_at(self) -> datetime:
+        """ Getter of the last update time
+        """
+        return datetime.utcfromtimestamp(self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value: datetime):
+        """ Setter of the last update time, stored as an epoch
+        """
+        self._updated_at = calendar.timegm(value.utctimetuple())
+
+    @classmethod
+    def _fields(cls) -> List[str]:
+        """ Names of the slot attributes, in declaration order
+        """
+        fields = FIELDS.get(cls)
+        if fields is None:
+            fields = ['id', 'created_at', 'updated_at']
+            for klass in reversed(cls.__mro__):
+                if klass is Base or klass is object:
+                    continue
+                for name in klass.__dict__.get('__slots__', ()):
+                    if name not in ('__dict__', '__weakref__'):
+                        fields.append(name)
+            FIELDS[cls] = fields
+        return fields
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
         """
@@ -44,11 +112,24 @@ class Base():
             return False
         return (self.id == other.id)
 
-    def to_json(self, for_serialization: bool = False) -> dict:
-        """ Convert the object a JSON dictionary
+    def to_json(self, for_serialization: bool = False,
+                fields: Iterable[str] = None) -> dict:
+        """ Convert the object a JSON dictionary, keeping only the
+        attributes in fields when given
         """
         result = {}
-        for key, value in self.__dict__.items():
+        items = []
+        names = self._fields()
+        if fields is not None:
+            names = [key for key in fields if key in names]
+        for key in names:
+            try:
+                items.append((key, getattr(self, key)))
+            except AttributeError:
+                continue
+        if fields is None:
+            items.extend(getattr(self, '__dict__', {}).items())
+        for key, value in items:
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -61,77 +142,94 @@ class Base():
     def load_from_file(cls):
         """ Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
-
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        storage.load(cls)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        storage.save_to_file(cls)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def flush(cls):
+        """ Write out everything the storage engine still holds
+        """
+        storage.flush()
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        storage.save(self)
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        storage.remove(self)
+
+    @classmethod
+    def discard(cls, ids: List[str]) -> int:
+        """ Drop objects by id in bulk; with the file engine the change
+        reaches the disk on the next save_to_file
+        """
+        return storage.discard(cls, ids)
+
+    @classmethod
+    def file_size(cls) -> int:
+        """ Bytes the objects take on disk
+        """
+        return storage.file_size(cls)
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return storage.count(cls)
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
         """ Return all objects
         """
-        return cls.search()
+        return storage.all(cls)
 
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return storage.get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        return storage.search(cls, attributes)
+
+    @classmethod
+    def query(cls, filters: dict = {}, order_by: str = None,
+              limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Stream objects matching filters, e.g.
+        User.query({'email__startswith': 'admin',
+                    'created_at__gte': datetime(2024, 1, 1)},
+                   order_by='-created_at', limit=50)
+        """
+        return storage.query(cls, filters, order_by, limit)
+
+    @classmethod
+    def page(cls, after: Tuple[datetime, str] = None,
+             limit: int = None) -> List[TypeVar('Base')]:
+        """ Objects ordered by created_at then id, starting right after
+        the (created_at, id) position `after`: objects added meanwhile
+        never shift a page
+        """
+        objs = []
+        filters = {}
+        if after is not None:
+            created_at, obj_id = after
+            objs = list(cls.query({'created_at': created_at,
+                                   'id__gt': obj_id},
+                                  order_by='id', limit=limit))
+            filters = {'created_at__gt': created_at}
+        if limit is not None:
+            limit -= len(objs)
+        objs.extend(cls.query(filters, order_by='created_at', limit=limit))
+        return objs
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+""" Binary record file for the models store
+
+Layout: the 4 bytes magic, then records of
+    flag (1 byte: 1 live, 0 removed)
+    key length, data length (4 bytes each, big endian)
+    key: JSON of the id and the indexed attributes
+    data: JSON of the whole object
+The file is read through mmap: opening it only walks the record headers
+and keys, and a removed record is tombstoned in place.
+
+Convert a file from the project root, either way:
+    python3 -m models.engine.binary_store .db_User.json .db_User.bin
+    python3 models/engine/binary_store.py .db_User.bin .db_User.json
+"""
+from typing import Iterator, List, Tuple
+from os import path
+import importlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+
+
+MAGIC = b'BDB1'
+HEADER = struct.Struct('>BII')
+LIVE = 1
+DEAD = 0
+# Base.sorted_attributes, for files of a class no model defines
+DEFAULT_KEY_FIELDS = ['created_at']
+
+
+class BinaryStore():
+    """ Append-only binary record file with an in-memory offset index
+    """
+
+    def __init__(self, file_path: str):
+        """ Open or create the file and index its live records
+        """
+        self.file_path = file_path
+        self.offsets = {}
+        self.keys = {}
+        self.dead_bytes = 0
+        self.live_bytes = 0
+        self._lock = threading.Lock()
+        if not path.exists(file_path):
+            with open(file_path, 'wb') as f:
+                f.write(MAGIC)
+        self._f = open(file_path, 'r+b')
+        self._map = None
+        self._remap()
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a binary store".format(file_path))
+        self._scan()
+
+    def _remap(self):
+        """ Map the whole file again, after it grew
+        """
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._f.fileno(), 0)
+
+    def _scan(self):
+        """ Build the offset index from the record headers and keys
+        """
+        pos = len(MAGIC)
+        size = len(self._map)
+        while pos + HEADER.size <= size:
+            flag, klen, dlen = HEADER.unpack_from(self._map, pos)
+            end = pos + HEADER.size + klen + dlen
+            if end > size:
+                # torn last record from a crash mid-append
+                break
+            if flag == LIVE:
+                start = pos + HEADER.size
+                key = json.loads(self._map[start:start + klen])
+                self._index(key, pos, end - pos)
+            else:
+                self.dead_bytes += end - pos
+            pos = end
+        if pos < size:
+            # cut the torn tail, or the next put would append behind it
+            # and the torn header would swallow the new records
+            self._map.close()
+            self._f.truncate(pos)
+            self._map = None
+            self._remap()
+
+    def _index(self, key: dict, offset: int, length: int):
+        """ Point the id of key at the record at offset
+        """
+        obj_id = key.get('id')
+        old = self.offsets.get(obj_id)
+        if old is not None:
+            self._tombstone(old)
+        self.offsets[obj_id] = offset
+        self.keys[obj_id] = key
+        self.live_bytes += length
+
+    def _length(self, offset: int) -> int:
+        """ Size of the record at offset
+        """
+        flag, klen, dlen = HEADER.unpack_from(self._map, offset)
+        return HEADER.size + klen + dlen
+
+    def _tombstone(self, offset: int):
+        """ Mark the record at offset as removed, in place
+        """
+        length = self._length(offset)
+        self._map[offset] = DEAD
+        self.live_bytes -= length
+        self.dead_bytes += length
+
+    def read(self, offset: int) -> dict:
+        """ Decode the object stored at offset
+        """
+        with self._lock:
+            return self._read(offset)
+
+    def _read(self, offset: int) -> dict:
+        """ Body of read, run under the lock
+        """
+        flag, klen, dlen = HEADER.unpack_from(self._map, offset)
+        start = offset + HEADER.size + klen
+        return json.loads(self._map[start:start + dlen])
+
+    def get(self, obj_id: str) -> dict:
+        """ Decode the object stored under obj_id, None if missing; the
+        offset is looked up under the lock, as a rewrite moves them all
+        """
+        with self._lock:
+            offset = self.offsets.get(obj_id)
+            if offset is None:
+                return None
+            return self._read(offset)
+
+    def put(self, key: dict, obj_json: dict) -> int:
+        """ Append a new version of an object and tombstone the old one,
+        return its offset
+        """
+        key_bytes = json.dumps(key).encode()
+        data_bytes = json.dumps(obj_json).encode()
+        record = HEADER.pack(LIVE, len(key_bytes), len(data_bytes)) + \
+            key_bytes + data_bytes
+        with self._lock:
+            self._f.seek(0, os.SEEK_END)
+            offset = self._f.tell()
+            self._f.write(record)
+            self._f.flush()
+            self._remap()
+            self._index(key, offset, len(record))
+        return offset
+
+    def delete(self, obj_id: str) -> bool:
+        """ Tombstone the record of obj_id
+        """
+        with self._lock:
+            offset = self.offsets.pop(obj_id, None)
+            self.keys.pop(obj_id, None)
+            if offset is None:
+                return False
+            self._tombstone(offset)
+            self._map.flush()
+        return True
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """ Yield (id, object) for every live record
+        """
+        for obj_id in list(self.offsets):
+            obj_json = self.get(obj_id)
+            if obj_json is not None:
+                yield obj_id, obj_json
+
+    def rewrite(self, objs: Iterator[Tuple[dict, dict]]):
+        """ Replace the file with only the given (key, object) records
+        """
+        tmp_path = "{}.tmp".format(self.file_path)
+        write_records(tmp_path, objs)
+        with self._lock:
+            self._map.close()
+            self._f.close()
+            os.replace(tmp_path, self.file_path)
+            self.offsets = {}
+            self.keys = {}
+            self.dead_bytes = 0
+            self.live_bytes = 0
+            self._f = open(self.file_path, 'r+b')
+            self._map = None
+            self._remap()
+            self._scan()
+
+    def close(self):
+        """ Unmap and close the file
+        """
+        with self._lock:
+            self._map.close()
+            self._f.close()
+
+
+def write_records(file_path: str, objs: Iterator[Tuple[dict, dict]]):
+    """ Write a new binary file from (key, object) pairs
+    """
+    with open(file_path, 'wb') as f:
+        f.write(MAGIC)
+        for key, obj_json in objs:
+            key_bytes = json.dumps(key).encode()
+            data_bytes = json.dumps(obj_json).encode()
+            f.write(HEADER.pack(LIVE, len(key_bytes), len(data_bytes)))
+            f.write(key_bytes)
+            f.write(data_bytes)
+
+
+def model_key_fields(json_path: str) -> List[str]:
+    """ indexed_attributes and sorted_attributes of the model stored in
+    a `.db_<Class>.json` file (models/<class>.py), DEFAULT_KEY_FIELDS if
+    not found
+    """
+    name = path.basename(json_path)[len('.db_'):].rsplit('.', 1)[0]
+    module = 'models.' + re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+    try:
+        cls = getattr(importlib.import_module(module), name)
+    except (ImportError, AttributeError):
+        return list(DEFAULT_KEY_FIELDS)
+    return list(dict.fromkeys(cls.indexed_attributes +
+                              cls.sorted_attributes))
+
+
+def json_to_binary(json_path: str, bin_path: str,
+                   key_fields: List[str] = None):
+    """ Convert a `.db_<Class>.json` file to the binary format, keeping
+    key_fields (by default the indexed attributes of the model) next to
+    the id so they can be indexed without decoding
+    """
+    if key_fields is None:
+        key_fields = model_key_fields(json_path)
+    with open(json_path, 'r') as f:
+        objs_json = json.load(f)
+
+    def _records():
+        for obj_id, obj_json in objs_json.items():
+            key = {'id': obj_id}
+            for field in key_fields:
+                key[field] = obj_json.get(field)
+            yield key, obj_json
+
+    write_records(bin_path, _records())
+
+
+def binary_to_json(bin_path: str, json_path: str):
+    """ Convert a binary file back to the `.db_<Class>.json` format
+    """
+    store = BinaryStore(bin_path)
+    objs_json = dict(store.items())
+    store.close()
+    with open(json_path, 'w') as f:
+        json.dump(objs_json, f)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python3 -m models.engine.binary_store <from> <to> "
+              "[indexed attribute ...]")
+        sys.exit(1)
+    # run as a file, only models/engine is on the path
+    root = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    if sys.argv[1].endswith('.json'):
+        json_to_binary(sys.argv[1], sys.argv[2], sys.argv[3:] or None)
+    else:
+        binary_to_json(sys.argv[1], sys.argv[2])
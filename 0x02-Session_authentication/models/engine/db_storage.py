@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+""" SQLite storage engine
+"""
+from typing import TypeVar, Iterator, List, Tuple
+from os import getenv, path
+from models.engine.sorted_index import next_prefix
+from models.engine.storage import Storage, parse_filters, parse_order
+from models.engine.storage import sort_key
+import json
+import sqlite3
+import threading
+
+
+SQL_TYPES = (str, int, float, bool, type(None))
+SQL_OPERATORS = {
+    'eq': 'IS', 'ne': 'IS NOT',
+    'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+}
+
+
+class DBStorage(Storage):
+    """
+    Keeps every model in one SQLite file (STORAGE_DB_PATH, `.db.sqlite3`
+    by default), so several worker processes can share the same data.
+
+    Each class gets a table `<Class>(id, data, <indexed attributes>)`:
+    `data` is the JSON of the object and every name in the model's
+    `indexed_attributes` and `sorted_attributes` is a column with its own
+    index. `query` turns the filters and the ordering on those columns
+    into SQL and checks the other filters on the loaded rows.
+    """
+    def __init__(self, db_path: str = None):
+        """ Initialize the engine, connections are opened per thread
+        """
+        self.db_path = db_path or getenv("STORAGE_DB_PATH", ".db.sqlite3")
+        self._local = threading.local()
+        self._tables = set()
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """ Return the connection of the current thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _table(self, cls: type) -> str:
+        """ Create the table and indexes of cls once, return its name
+        """
+        s_class = cls.__name__
+        if s_class in self._tables:
+            return s_class
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute('CREATE TABLE IF NOT EXISTS "{}" '
+                         '(id TEXT PRIMARY KEY, data TEXT NOT NULL)'
+                         .format(s_class))
+            rows = conn.execute('PRAGMA table_info("{}")'.format(s_class))
+            columns = {row[1] for row in rows}
+            for attr in self._columns(cls):
+                if attr not in columns:
+                    conn.execute('ALTER TABLE "{}" ADD COLUMN "{}"'
+                                 .format(s_class, attr))
+                    conn.execute('UPDATE "{0}" SET "{1}" = '
+                                 'json_extract(data, ?)'
+                                 .format(s_class, attr), ('$.' + attr,))
+                conn.execute('CREATE INDEX IF NOT EXISTS "{0}_{1}" '
+                             'ON "{0}" ("{1}")'.format(s_class, attr))
+            self._tables.add(s_class)
+        return s_class
+
+    def _columns(self, cls: type) -> Tuple[str]:
+        """ Attributes stored in their own indexed column
+        """
+        names = cls.indexed_attributes + cls.sorted_attributes
+        return tuple(dict.fromkeys(names))
+
+    def load(self, cls: type):
+        """ Nothing to read up front: make sure the table exists
+        """
+        self._table(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or replace the row of an object
+        """
+        cls = obj.__class__
+        table = self._table(cls)
+        columns = ['id', 'data']
+        values = [obj.id, json.dumps(obj.to_json(True))]
+        for attr in self._columns(cls):
+            columns.append(attr)
+            values.append(sort_key(getattr(obj, attr, None)))
+        self._connection().execute(
+            'INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                table, ', '.join('"{}"'.format(c) for c in columns),
+                ', '.join('?' for c in columns)), values)
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete the row of an object
+        """
+        table = self._table(obj.__class__)
+        self._connection().execute(
+            'DELETE FROM "{}" WHERE id = ?'.format(table), (obj.id,))
+
+    def discard(self, cls: type, ids: List[str]) -> int:
+        """ Delete rows in batches, see Storage.discard
+        """
+        table = self._table(cls)
+        ids = list(ids)
+        dropped = 0
+        conn = self._connection()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cursor = conn.execute('DELETE FROM "{}" WHERE id IN ({})'.format(
+                table, ', '.join('?' for obj_id in chunk)), chunk)
+            dropped += cursor.rowcount
+        return dropped
+
+    def file_size(self, cls: type) -> int:
+        """ Size of the database file and its write-ahead log, shared
+        by every class
+        """
+        size = 0
+        for file_path in (self.db_path, self.db_path + '-wal'):
+            if path.exists(file_path):
+                size += path.getsize(file_path)
+        return size
+
+    def count(self, cls: type) -> int:
+        """ Count all rows of the class
+        """
+        table = self._table(cls)
+        row = self._connection().execute(
+            'SELECT COUNT(*) FROM "{}"'.format(table)).fetchone()
+        return row[0]
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        table = self._table(cls)
+        row = self._connection().execute(
+            'SELECT data FROM "{}" WHERE id = ?'.format(table),
+            (id,)).fetchone()
+        if row is None:
+            return None
+        return cls(**json.loads(row[0]))
+
+    def _where(self, cls: type,
+               predicates: list) -> Tuple[list, list, list]:
+        """ SQL conditions for the predicates on columns, and the
+        predicates left to check in Python
+        """
+        columns = ('id',) + self._columns(cls)
+        where = []
+        params = []
+        rest = []
+        for attr, op, value in predicates:
+            key = sort_key(value)
+            if attr not in columns:
+                rest.append((attr, op, value))
+            elif op == 'in' and all(type(v) in SQL_TYPES and v is not None
+                                    for v in value):
+                if len(value) == 0:
+                    where.append('0')
+                else:
+                    where.append('"{}" IN ({})'.format(
+                        attr, ', '.join('?' for v in value)))
+                    params.extend(sort_key(v) for v in value)
+            elif type(key) not in SQL_TYPES:
+                rest.append((attr, op, value))
+            elif op in SQL_OPERATORS:
+                where.append('"{}" {} ?'.format(attr, SQL_OPERATORS[op]))
+                params.append(key)
+            elif op == 'startswith' and isinstance(key, str) and key:
+                where.append('"{0}" >= ? AND "{0}" < ?'.format(attr))
+                params.extend([key, next_prefix(key)])
+            else:
+                rest.append((attr, op, value))
+        return where, params, rest
+
+    def query(self, cls: type, filters: dict = {}, order_by: str = None,
+              limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Stream the objects matching filters, see Storage.query
+        """
+        table = self._table(cls)
+        predicates = parse_filters(filters)
+        where, params, rest = self._where(cls, predicates)
+        attr_order, desc = parse_order(order_by)
+
+        query = 'SELECT data FROM "{}"'.format(table)
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        if attr_order in ('id',) + self._columns(cls):
+            direction = 'DESC' if desc else 'ASC'
+            query += ' ORDER BY "{0}" {1}, id {1}'.format(
+                attr_order, direction)
+            attr_order = None
+        if limit is not None and not rest and attr_order is None:
+            query += ' LIMIT {}'.format(int(limit))
+        cursor = self._connection().execute(query, params)
+        return self._run(cls, cursor, rest, attr_order, desc, limit)
+
+    def _run(self, cls: type, cursor: sqlite3.Cursor, predicates: list,
+             attr_order: str, desc: bool,
+             limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Yield the objects of the rows that match the predicates left,
+        sorting them first when SQL could not
+        """
+        if limit is not None and limit <= 0:
+            return
+        objs = (cls(**json.loads(row[0])) for row in cursor)
+        objs = (obj for obj in objs if self.matches(obj, predicates))
+        if attr_order is not None:
+            def _key(obj):
+                value = sort_key(getattr(obj, attr_order, None))
+                return (value is not None, value, obj.id)
+            objs = iter(sorted(objs, key=_key, reverse=desc))
+        found = 0
+        for obj in objs:
+            yield obj
+            found += 1
+            if limit is not None and found >= limit:
+                return
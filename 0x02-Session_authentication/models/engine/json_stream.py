@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+""" Incremental reader for the `.db_<Class>.json` files
+"""
+from typing import IO, Iterator, Tuple
+import json
+
+
+CHUNK_SIZE = 64 * 1024
+DECODER = json.JSONDecoder()
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+class JSONStream():
+    """ Buffer over a file that decodes one JSON value at a time,
+    reading more of the file only when a value is cut off
+    """
+
+    def __init__(self, f: IO, chunk_size: int = CHUNK_SIZE):
+        """ Initialize the stream on an open text file
+        """
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """ Drop what was consumed and read one more chunk, False at the
+        end of the file
+        """
+        more = self.f.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + more
+        self.pos = 0
+        if not more:
+            self.eof = True
+        return len(more) > 0
+
+    def peek(self) -> str:
+        """ Return the next non-blank character, '' at the end
+        """
+        while True:
+            buf = self.buf
+            while self.pos < len(buf) and buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(buf):
+                return buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str):
+        """ Consume char or raise ValueError
+        """
+        if self.peek() != char:
+            raise ValueError("Expected '{}'".format(char))
+        self.pos += 1
+
+    def decode(self):
+        """ Decode the next JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            if type(value) in (int, float) and not self.eof and \
+                    (end == len(self.buf) or self.buf[end] in NUMBER_CHARS):
+                # the number may go on in the next chunk
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_items(f: IO, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple]:
+    """ Yield the (key, value) pairs of the top-level JSON object in f
+    without loading the whole file
+    """
+    stream = JSONStream(f, chunk_size)
+    if stream.peek() == '':
+        return
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.decode()
+        stream.expect(':')
+        yield key, stream.decode()
+        char = stream.peek()
+        stream.expect(char if char in ',}' else ',')
+        if char == '}':
+            return
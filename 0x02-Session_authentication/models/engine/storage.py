@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+""" Storage engine interface for the models
+"""
+from datetime import datetime
+from typing import TypeVar, List, Iterable, Iterator, Tuple
+
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def sort_key(value):
+    """ Value as indexed and compared: datetimes become their string
+    form, which sorts like the datetime and like the raw JSON value
+    """
+    if type(value) is datetime:
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+def _startswith(value, prefix) -> bool:
+    """ str.startswith that is False for non-strings
+    """
+    return isinstance(value, str) and value.startswith(prefix)
+
+
+def _compare(test):
+    """ Wrap a comparison so None or mismatched types never match
+    """
+    def _op(value, arg) -> bool:
+        if value is None or arg is None:
+            return False
+        try:
+            return test(sort_key(value), sort_key(arg))
+        except TypeError:
+            return False
+    return _op
+
+
+OPERATORS = {
+    'eq': lambda value, arg: value == arg,
+    'ne': lambda value, arg: value != arg,
+    'in': lambda value, arg: value in arg,
+    'startswith': _startswith,
+    'gt': _compare(lambda value, arg: value > arg),
+    'gte': _compare(lambda value, arg: value >= arg),
+    'lt': _compare(lambda value, arg: value < arg),
+    'lte': _compare(lambda value, arg: value <= arg),
+}
+
+
+def parse_order(order_by: str) -> Tuple[str, bool]:
+    """ Split 'attr' / '-attr' into (attr, descending)
+    """
+    if not order_by:
+        return None, False
+    if order_by.startswith('-'):
+        return order_by[1:], True
+    return order_by, False
+
+
+def parse_filters(filters: dict) -> List[Tuple[str, str, object]]:
+    """ Turn {'attr__op': value} filters into (attr, op, value)
+    predicates; a key without a known operator suffix means equality.
+    `in` values are turned into lists.
+    """
+    predicates = []
+    for key, value in filters.items():
+        attr, sep, op = key.rpartition('__')
+        if not sep or op not in OPERATORS:
+            attr, op = key, 'eq'
+        if op == 'in':
+            value = list(value)
+        predicates.append((attr, op, value))
+    return predicates
+
+
+class Storage():
+    """
+    Interface every storage engine implements. `Base` forwards its
+    class-level queries and its `save`/`remove` here, passing the model
+    class along.
+    """
+    def load(self, cls: type):
+        """
+        load or attach the stored objects of cls.
+
+        Args:
+            cls (type): the model class
+        """
+        return None
+
+    def save_to_file(self, cls: type):
+        """
+        write every object of cls to the backing store.
+
+        Args:
+            cls (type): the model class
+        """
+        return None
+
+    def flush(self):
+        """
+        write out anything the engine still holds in memory.
+        """
+        return None
+
+    def save(self, obj: TypeVar('Base')):
+        """
+        insert or replace an object.
+
+        Args:
+            obj (TypeVar('Base')): the object to save
+        """
+        return None
+
+    def remove(self, obj: TypeVar('Base')):
+        """
+        delete an object.
+
+        Args:
+            obj (TypeVar('Base')): the object to remove
+        """
+        return None
+
+    def discard(self, cls: type, ids: List[str]) -> int:
+        """
+        drop objects of cls in bulk without recording each removal;
+        engines keeping a file write the change with the next
+        `save_to_file`.
+
+        Args:
+            cls (type): the model class
+            ids (List[str]): ids of the objects to drop
+
+        Returns:
+            int: the number of objects dropped
+        """
+        return 0
+
+    def file_size(self, cls: type) -> int:
+        """
+        bytes the objects of cls take on disk.
+
+        Args:
+            cls (type): the model class
+
+        Returns:
+            int: the size in bytes
+        """
+        return 0
+
+    def count(self, cls: type) -> int:
+        """
+        number of objects of cls.
+
+        Args:
+            cls (type): the model class
+
+        Returns:
+            int: the number of objects
+        """
+        return 0
+
+    def all(self, cls: type) -> Iterable[TypeVar('Base')]:
+        """
+        every object of cls.
+
+        Args:
+            cls (type): the model class
+
+        Returns:
+            Iterable[TypeVar('Base')]: the objects
+        """
+        return self.search(cls)
+
+    def get(self, cls: type, id: str) -> TypeVar('Base'):
+        """
+        one object of cls by id.
+
+        Args:
+            cls (type): the model class
+            id (str): the object id
+
+        Returns:
+            TypeVar('Base'): the object or None
+        """
+        return None
+
+    def search(self, cls: type,
+               attributes: dict = {}) -> List[TypeVar('Base')]:
+        """
+        objects of cls matching every filter.
+
+        Args:
+            cls (type): the model class
+            attributes (dict): filters, see `query`
+
+        Returns:
+            List[TypeVar('Base')]: matching objects
+        """
+        return list(self.query(cls, attributes))
+
+    def query(self, cls: type, filters: dict = {}, order_by: str = None,
+              limit: int = None) -> Iterator[TypeVar('Base')]:
+        """
+        stream the objects of cls matching every filter.
+
+        Args:
+            cls (type): the model class
+            filters (dict): {'attr': value} for equality, or
+            {'attr__op': value} with op one of eq, ne, in, startswith,
+            gt, gte, lt, lte
+            order_by (str): attribute to sort on, '-attr' for descending
+            limit (int): maximum number of objects
+
+        Returns:
+            Iterator[TypeVar('Base')]: the matching objects
+        """
+        return iter([])
+
+    @staticmethod
+    def matches(obj: TypeVar('Base'), predicates: list) -> bool:
+        """
+        check an object against parsed filters.
+
+        Args:
+            obj (TypeVar('Base')): the object
+            predicates (list): (attr, op, value) from parse_filters
+
+        Returns:
+            bool: True if every predicate holds
+        """
+        for attr, op, value in predicates:
+            if not OPERATORS[op](getattr(obj, attr), value):
+                return False
+        return True
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+""" Write-behind flusher module
+"""
+from typing import TypeVar
+import atexit
+import threading
+import time
+
+
+class WriteBehind():
+    """ Background thread that coalesces snapshot writes
+
+    Saves only mark their class dirty; the thread waits `interval`
+    seconds after the first one so every write made in that window
+    goes to disk in a single `save_to_file` per class.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        """ Initialize the flusher, the thread starts on first write
+        """
+        self.interval = interval
+        self._dirty = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._started = 0
+        self._done = 0
+        self._stopped = False
+        self._thread = None
+        atexit.register(self.stop)
+
+    def mark_dirty(self, cls: TypeVar('Base'), wait: bool = False):
+        """ Schedule a flush of cls, and if wait is set block until a
+        flush that includes this write has completed
+        """
+        with self._cond:
+            self._dirty[cls.__name__] = cls
+            ticket = self._started + 1
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run,
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            if not wait:
+                return
+            while self._done < ticket:
+                self._cond.wait()
+
+    def flush(self):
+        """ Write every dirty class to disk now
+        """
+        with self._flush_lock:
+            with self._cond:
+                dirty = self._dirty
+                self._dirty = {}
+                self._started += 1
+                ticket = self._started
+            try:
+                for cls in dirty.values():
+                    cls.save_to_file()
+            finally:
+                with self._cond:
+                    self._done = ticket
+                    self._cond.notify_all()
+
+    def stop(self):
+        """ Flush pending writes and stop the thread (shutdown hook)
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        """ Thread loop: wait for a dirty class, let the window fill,
+        then flush
+        """
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+            time.sleep(self.interval)
+            self.flush()
@@ -8,13 +8,23 @@ class UserSession(Base):
     """
     Creates a new session for the user
 
+    The session id is the id of the object, so `UserSession.get` finds a
+    session directly; `user_id` is indexed for the sessions of a user.
+    Sessions are journaled: a login appends a record and a logout a
+    tombstone instead of rewriting every session.
+
     Args:
         Base (_type_): the base model inherited from
     """
+    __slots__ = ('user_id', 'session_id')
+    indexed_attributes = ('user_id',)
+    journaled = True
+
     def __init__(self, *args: list, **kwargs: dict):
-        if kwargs:
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-        else:
-            self.user_id = args[0]
-            self.session_id = args[1]
+        """ Initialize a UserSession instance
+        """
+        if kwargs.get('session_id') is not None:
+            kwargs['id'] = kwargs.get('session_id')
+        super().__init__(*args, **kwargs)
+        self.user_id = kwargs.get('user_id')
+        self.session_id = self.id
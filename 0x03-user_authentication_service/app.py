@@ -9,6 +9,14 @@ app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.teardown_appcontext
+def remove_db_session(exception=None) -> None:
+    """
+    give the database session of the request back
+    """
+    AUTH.remove_db_session()
+
+
 @app.route('/')
 def home():
     """
@@ -5,6 +5,7 @@
 from bcrypt import hashpw, checkpw, gensalt
 from db import DB
 from user import User
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 from typing import Union as U
 from uuid import uuid4
@@ -35,6 +36,12 @@ class Auth:
         """
         self._db = DB()
 
+    def remove_db_session(self) -> None:
+        """
+        release the database session of the current thread
+        """
+        self._db.remove_session()
+
     def register_user(self, email: str, password: str) -> User:
         """
         register a new user
@@ -46,15 +53,11 @@ class Auth:
         Returns:
             User: the new user object
         """
-        try:
-            obj = self._db.find_user_by(email=email)
-            if obj:
-                raise ValueError("User {} already exists".format(email))
-        except NoResultFound:
-            pass
-
         hashed_password: bytes = _hash_password(password)
-        return self._db.add_user(email, hashed_password)
+        try:
+            return self._db.add_user(email, hashed_password)
+        except IntegrityError:
+            raise ValueError("User {} already exists".format(email))
 
     def valid_login(self, email: str, password: str) -> bool:
         """
@@ -124,9 +127,7 @@ class Auth:
             user_id (int): user id
         """
         try:
-            user = self._db.find_user_by(id=user_id)
-            if user:
-                self._db.update_user(user.id, session_id=None)
+            self._db.update_user(user_id, session_id=None)
         except Exception:
             return None
 
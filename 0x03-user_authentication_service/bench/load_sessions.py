@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+""" Concurrent load test of login and profile requests
+
+THREADS clients (16 by default) each log in and read their profile
+ROUNDS times (30), through the Flask test client and a fresh database
+in a temporary directory. Passwords are hashed with bcrypt cost 4, so
+the test loads the database rather than the hashing. Every request must
+succeed.
+
+Usage: python3 bench/load_sessions.py
+"""
+from collections import Counter
+from os import getenv, path
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())
+
+import auth  # noqa: E402
+import bcrypt  # noqa: E402
+
+auth.gensalt = lambda: bcrypt.gensalt(4)
+
+from app import app  # noqa: E402
+
+THREADS = int(getenv("THREADS", 16))
+ROUNDS = int(getenv("ROUNDS", 30))
+
+
+def client(number: int, latencies: list, errors: Counter):
+    """ log in and read the profile ROUNDS times
+    """
+    c = app.test_client()
+    email = "u{}@x.io".format(number)
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        r = c.post("/sessions", data={"email": email, "password": "pw"})
+        if r.status_code != 200:
+            errors["login {}".format(r.status_code)] += 1
+            continue
+        r = c.get("/profile")
+        if r.status_code != 200 or r.get_json() != {"email": email}:
+            errors["profile {}".format(r.status_code)] += 1
+        latencies.append(time.perf_counter() - start)
+
+
+def main() -> int:
+    """ run the load test, 0 if every request succeeded
+    """
+    c = app.test_client()
+    for number in range(THREADS):
+        c.post("/users", data={"email": "u{}@x.io".format(number),
+                               "password": "pw"})
+    latencies, errors = [], Counter()
+    threads = [threading.Thread(target=client,
+                                args=(number, latencies, errors))
+               for number in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latencies) or [0]
+    print("{} threads, {} login + profile in {:.2f}s, p50 {:.1f} ms, "
+          "p99 {:.1f} ms, errors {} {}".format(
+              THREADS, THREADS * ROUNDS, elapsed,
+              latencies[len(latencies) // 2] * 1000,
+              latencies[int(len(latencies) * 0.99)] * 1000,
+              sum(errors.values()), dict(errors)))
+    print("FAILED" if errors else "OK")
+    return int(bool(errors))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
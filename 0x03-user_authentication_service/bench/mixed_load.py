@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+""" Read/write mixed-load benchmark of the SQLite settings
+
+With SQLite's own defaults, then with the tuned pragmas of db.py, fills
+a fresh database with USERS users (10000 by default) and runs THREADS
+threads (16) for DURATION seconds (5): 80% of the operations look a
+user up by session id, 20% update a user. Every operation must succeed.
+
+Usage: python3 bench/mixed_load.py
+"""
+from collections import Counter, defaultdict
+from os import getenv, path
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import db  # noqa: E402
+
+USERS = int(getenv("USERS", 10000))
+THREADS = int(getenv("THREADS", 16))
+DURATION = float(getenv("DURATION", 5))
+
+
+def worker(database: db.DB, seed: int, stop: float,
+           latencies: dict, errors: Counter):
+    """ run random reads and writes until stop
+    """
+    rnd = random.Random(seed)
+    while time.time() < stop:
+        i = rnd.randrange(USERS)
+        kind = "write" if rnd.random() < 0.2 else "read"
+        start = time.perf_counter()
+        try:
+            if kind == "read":
+                database.find_user_by(session_id="s{}".format(i))
+            else:
+                database.update_user(i + 1, reset_token=str(rnd.random()))
+            latencies[kind].append(time.perf_counter() - start)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+        finally:
+            database.remove_session()
+
+
+def run(label: str) -> int:
+    """ one run in a new database, returns the number of errors
+    """
+    os.chdir(tempfile.mkdtemp())
+    database = db.DB()
+    database.add_users_bulk([{"email": "u{}@x.io".format(i),
+                              "hashed_password": "h",
+                              "session_id": "s{}".format(i)}
+                             for i in range(USERS)])
+    latencies, errors = defaultdict(list), Counter()
+    stop = time.time() + DURATION
+    threads = [threading.Thread(target=worker, args=(database, seed, stop,
+                                                     latencies, errors))
+               for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    database._engine.dispose()
+    for kind in ("read", "write"):
+        values = sorted(latencies[kind]) or [0]
+        print("{:8} {:5} {:6.0f}/s  p50 {:6.2f} ms  p99 {:7.2f} ms".format(
+            label, kind, len(latencies[kind]) / DURATION,
+            values[len(values) // 2] * 1000,
+            values[int(len(values) * 0.99)] * 1000))
+    if errors:
+        print("{:8} errors {}".format(label, dict(errors)))
+    return sum(errors.values())
+
+
+def main() -> int:
+    """ compare SQLite's defaults with the tuned pragmas
+    """
+    saved = {name: os.environ.get("DB_SQLITE_" + name.upper())
+             for name in db.SQLITE_PRAGMAS}
+    for name in db.SQLITE_PRAGMAS:
+        os.environ["DB_SQLITE_" + name.upper()] = ""
+    errors = run("default")
+    for name, value in saved.items():
+        if value is None:
+            del os.environ["DB_SQLITE_" + name.upper()]
+        else:
+            os.environ["DB_SQLITE_" + name.upper()] = value
+    errors += run("tuned")
+    print("FAILED" if errors else "OK")
+    return int(bool(errors))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
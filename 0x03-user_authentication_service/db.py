@@ -1,32 +1,202 @@
 #!/usr/bin/env python3
 """DB module
 """
-from sqlalchemy import create_engine
+from os import getenv
+from sqlalchemy import (Column, Integer, Table, bindparam, create_engine,
+                        event, insert, inspect, select, update)
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm.util import identity_key
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool
 from user import Base, User
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from typing import Dict, List
+import re
+
+
+SCHEMA_VERSION = 1
+schema_version = Table("schema_version", Base.metadata,
+                       Column("version", Integer, nullable=False))
+
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": "-65536",
+    "busy_timeout": "5000",
+    "mmap_size": "268435456",
+}
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """
+    pragmas set on every new SQLite connection: SQLITE_PRAGMAS, each
+    overridden by the environment variable DB_SQLITE_<NAME>, an empty
+    value leaving SQLite's own default
+
+    Raises:
+        ValueError: a value is not a number or a word
+
+    Returns:
+        Dict[str, str]: pragma name-value pairs
+    """
+    pragmas = {}
+    for name, default in SQLITE_PRAGMAS.items():
+        value = getenv("DB_SQLITE_" + name.upper(), default)
+        if not value:
+            continue
+        if not re.fullmatch(r"-?\w+", value):
+            raise ValueError("invalid value for PRAGMA {}: {}".format(
+                name, value))
+        pragmas[name] = value
+    return pragmas
+
+
+def set_pragmas(engine: Engine, pragmas: Dict[str, str]) -> None:
+    """
+    run the pragmas on every connection the engine opens
+
+    Args:
+        engine (Engine): engine of an SQLite database
+        pragmas (Dict[str, str]): pragma name-value pairs
+    """
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        """ set the pragmas of a new connection """
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute("PRAGMA {} = {}".format(name, value))
+        cursor.close()
+
+
+USER_COLUMNS = frozenset(User.__table__.columns.keys())
+
+
+def check_columns(values: Dict) -> None:
+    """
+    check that every key of values is a column of the users table
+
+    Args:
+        values (Dict): column name-value pairs
+
+    Raises:
+        ValueError: a key is not a column
+    """
+    if not USER_COLUMNS.issuperset(values):
+        raise ValueError
+
+
+def stored_version(engine: Engine) -> int:
+    """
+    schema version recorded in a database
+
+    Args:
+        engine (Engine): engine of the database
+
+    Returns:
+        int: the version, 0 for a database that never recorded one
+    """
+    if not inspect(engine).has_table(schema_version.name):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(select(schema_version.c.version)).scalar() or 0
+
+
+def upgrade(engine: Engine) -> None:
+    """
+    create the tables and indexes a database lacks and record the
+    current schema version, unless it already has it
+
+    Args:
+        engine (Engine): engine of the database
+
+    Raises:
+        RuntimeError: the database has a newer schema than the models
+    """
+    version = stored_version(engine)
+    if version == SCHEMA_VERSION:
+        return
+    if version > SCHEMA_VERSION:
+        raise RuntimeError("database schema version {} is newer than {}"
+                           .format(version, SCHEMA_VERSION))
+    Base.metadata.create_all(engine)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(schema_version.delete())
+        conn.execute(schema_version.insert().values(version=SCHEMA_VERSION))
+
+
+def migrate(engine: Engine) -> None:
+    """
+    bring the tables of an existing database up to the models, creating
+    the indexes they declare and the file lacks. Creating the unique
+    email index fails with an IntegrityError if two users already share
+    an email.
+
+    Args:
+        engine (Engine): engine of the database
+    """
+    tables = set(inspect(engine).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 
 class DB:
-    """ DB class """
+    """ DB class
+
+    The database is DB_URL (default sqlite:///a.db). With DB_MODE=test
+    (the default) it is emptied on start; with DB_MODE=persistent its
+    data is kept and only the missing tables and indexes are created,
+    once per schema version. SQLite connections are tuned by
+    sqlite_pragmas (WAL journal, synchronous NORMAL, 64 MiB page cache,
+    5 s busy timeout and 256 MiB of memory-mapped I/O by default).
+
+    Every thread works in its own session, taken from a scoped_session
+    registry and given back with `remove_session` (the app does it at
+    request teardown). Connections come from a pool of DB_POOL_SIZE
+    (default 5) plus DB_MAX_OVERFLOW (default 10), checked before use
+    unless DB_POOL_PRE_PING is 0.
+    """
 
     def __init__(self) -> None:
         """ Initialize a new DB instance """
-        self._engine = create_engine("sqlite:///a.db")
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        url = getenv("DB_URL", "sqlite:///a.db")
+        connect_args = {}
+        if url.startswith("sqlite"):
+            connect_args["check_same_thread"] = False
+        self._engine = create_engine(
+            url,
+            poolclass=QueuePool,
+            pool_size=int(getenv("DB_POOL_SIZE", 5)),
+            max_overflow=int(getenv("DB_MAX_OVERFLOW", 10)),
+            pool_pre_ping=getenv("DB_POOL_PRE_PING", "1") != "0",
+            connect_args=connect_args)
+        if url.startswith("sqlite"):
+            set_pragmas(self._engine, sqlite_pragmas())
+        mode = getenv("DB_MODE", "test")
+        if mode not in ("test", "persistent"):
+            raise ValueError("DB_MODE must be test or persistent")
+        if mode == "test":
+            Base.metadata.drop_all(self._engine)
+        upgrade(self._engine)
+        self.__session = scoped_session(
+            sessionmaker(bind=self._engine, expire_on_commit=False))
 
     @property
     def _session(self) -> Session:
-        """ Memoized session object """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        """ Session object of the current thread """
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """ Close the session of the current thread, giving its
+        connection back to the pool """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -35,10 +205,17 @@ class DB:
         Args:
             email (str): new user email
             hashed_password (str): new user password
+
+        Raises:
+            IntegrityError: the email is already registered
         """
         new_user = User(email=email, hashed_password=hashed_password)
         self._session.add(new_user)
-        self._session.commit()
+        try:
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
         return new_user
 
     def find_user_by(self, **kwargs) -> User:
@@ -57,14 +234,96 @@ class DB:
         return obj
 
     def update_user(self, user_id: int, **kwargs) -> None:
-        """ Finds user record and updates attributes """
-        user_found = self.find_user_by(id=user_id)
+        """
+        update the columns of a user with a single UPDATE statement. If
+        this session loaded the user, the columns updated are expired, to
+        be read again.
 
-        for key, value in kwargs.items():
-            if hasattr(user_found, key):
-                setattr(user_found, key, value)
-            else:
-                raise ValueError
+        Args:
+            user_id (int): the user id
+            kwargs (Dict[str: str]): the column-value pairs
 
+        Raises:
+            ValueError: a key is not a column of users
+            NoResultFound: no user has this id
+        """
+        check_columns(kwargs)
+        if not kwargs:
+            self.find_user_by(id=user_id)
+            return None
+        result = self._session.execute(
+            update(User).where(User.id == user_id).values(**kwargs),
+            execution_options={"synchronize_session": False})
         self._session.commit()
+        if result.rowcount == 0:
+            raise NoResultFound
+        user = self._session.identity_map.get(identity_key(User, user_id))
+        if user is not None:
+            self._session.expire(user, list(kwargs))
         return None
+
+    def add_users_bulk(self, users: List[Dict]) -> int:
+        """
+        insert many users with one executemany, in one transaction
+
+        Args:
+            users (List[Dict]): the column-value pairs of each user
+
+        Raises:
+            ValueError: a key is not a column of users
+            IntegrityError: an email is already registered, nothing is
+            inserted
+
+        Returns:
+            int: the number of users inserted
+        """
+        for values in users:
+            check_columns(values)
+        if not users:
+            return 0
+        try:
+            self._session.execute(insert(User), users)
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
+        return len(users)
+
+    def update_users_bulk(self, updates: List[Dict]) -> int:
+        """
+        update many users in one transaction, one executemany per set of
+        columns updated; mappings with only an id are skipped. Users
+        already loaded by this session are expired, to be read again.
+
+        Args:
+            updates (List[Dict]): the column-value pairs of each user,
+            with its id
+
+        Raises:
+            ValueError: a key is not a column of users, or an id is missing
+
+        Returns:
+            int: the number of users updated, ids matching no user left
+            out
+        """
+        groups = {}
+        for values in updates:
+            check_columns(values)
+            if "id" not in values:
+                raise ValueError
+            columns = tuple(sorted(key for key in values if key != "id"))
+            groups.setdefault(columns, []).append(values)
+        groups.pop((), None)
+        if not groups:
+            return 0
+        table = User.__table__
+        updated = 0
+        for columns, rows in groups.items():
+            statement = table.update() \
+                .where(table.c.id == bindparam("user_id")) \
+                .values({column: bindparam(column) for column in columns})
+            params = [dict(row, user_id=row["id"]) for row in rows]
+            updated += self._session.execute(statement, params).rowcount
+        self._session.commit()
+        self._session.expire_all()
+        return updated
@@ -13,12 +13,16 @@ class User(Base):
     """
     an SQLAlchemy model named User for a database table named users
 
+    email, session_id and reset_token are each indexed, as every
+    login, request and password reset looks a user up by one of them;
+    the email index is unique.
+
     Args:
         Base (SQLAlchemy): sqlalchemy declarative base
     """
     __tablename__: str = "users"
     id = Column(Integer, primary_key=True)
-    email = Column(VARCHAR(250), nullable=False)
+    email = Column(VARCHAR(250), nullable=False, unique=True, index=True)
     hashed_password = Column(VARCHAR(250), nullable=False)
-    session_id = Column(VARCHAR(250))
-    reset_token = Column(VARCHAR(250))
+    session_id = Column(VARCHAR(250), index=True)
+    reset_token = Column(VARCHAR(250), index=True)